@@ -0,0 +1,154 @@
+from collections import Counter
+
+# Hotkey entries triggered only by their abbreviation are stored under this key prefix
+ABBR_KEY_PREFIX = "abbr:"
+# Longest abbreviation accepted; also how many typed characters are kept
+MAX_ABBR_LEN = 32
+
+# Key names that type a character other than their own name
+CHAR_NAMES = {'space': ' '}
+# Keys that change what is typed without breaking the typed run
+MODIFIER_KEYS = {
+    'shift', 'left shift', 'right shift', 'caps lock',
+}
+# While one of these is held, keys are shortcuts rather than typing
+SHORTCUT_MODIFIERS = {
+    'ctrl', 'left ctrl', 'right ctrl', 'alt', 'left alt', 'right alt', 'alt gr',
+    'windows', 'left windows', 'right windows',
+}
+
+
+class AbbreviationMatcher:
+    """Matches typed abbreviations such as ';addr' against a rolling buffer.
+
+    The last `max_len` typed characters are kept as a string. Abbreviations
+    are indexed by their exact text, and on each keystroke the buffer's
+    suffix of every length some abbreviation has is looked up once, longest
+    first. A keystroke therefore costs one dict lookup per distinct
+    abbreviation length, however many abbreviations there are, and adding
+    or removing one only touches its own entry. Matching is case-insensitive
+    and fires as soon as an abbreviation has been typed.
+
+    The GUI thread edits the index while the hook thread reads it; every
+    change is a single dict operation or attribute swap.
+    """
+
+    def __init__(self, max_len=MAX_ABBR_LEN):
+        self.max_len = max_len
+        self._abbrs = {}  # abbreviation -> hotkey
+        self._keys = {}   # hotkey -> abbreviation
+        self._length_counts = Counter()
+        self._lengths = ()  # distinct abbreviation lengths, longest first
+        self._typed = ""
+        self._held = set()
+
+    def __len__(self):
+        return len(self._abbrs)
+
+    def __contains__(self, abbr):
+        return abbr.lower() in self._abbrs
+
+    @staticmethod
+    def check(abbr):
+        """Error message for an unusable abbreviation, or None."""
+        if not abbr:
+            return "empty abbreviation"
+        if len(abbr) > MAX_ABBR_LEN:
+            return f"abbreviation longer than {MAX_ABBR_LEN} characters"
+        if any(c in '\t\r\n' for c in abbr):
+            return "abbreviation contains a tab or newline"
+        return None
+
+    def _count_length(self, n, delta):
+        self._length_counts[n] += delta
+        if self._length_counts[n] <= 0:
+            del self._length_counts[n]
+        lengths = tuple(sorted(self._length_counts, reverse=True))
+        if lengths != self._lengths:
+            self._lengths = lengths
+
+    def add(self, abbr, key):
+        abbr = abbr.lower()
+        err = self.check(abbr)
+        if err:
+            raise ValueError(err)
+        self.remove_key(key)
+        old = self._abbrs.get(abbr)
+        if old is not None:
+            # The newest hotkey takes over an abbreviation already in use
+            self._keys.pop(old, None)
+        else:
+            self._count_length(len(abbr), 1)
+        self._abbrs[abbr] = key
+        self._keys[key] = abbr
+
+    def remove_key(self, key):
+        abbr = self._keys.pop(key, None)
+        if abbr is None:
+            return
+        del self._abbrs[abbr]
+        self._count_length(len(abbr), -1)
+
+    def rebuild(self, pairs):
+        """Replace every abbreviation from (hotkey, abbreviation) pairs; bad ones are reported and skipped."""
+        self.clear()
+        for key, abbr in pairs:
+            if abbr:
+                try:
+                    self.add(abbr, key)
+                except ValueError as e:
+                    print(f"Hotkey '{key}': {e}")
+
+    def clear(self):
+        self._abbrs = {}
+        self._keys = {}
+        self._length_counts = Counter()
+        self._lengths = ()
+        self._typed = ""
+
+    def abbr_of(self, key):
+        return self._keys.get(key)
+
+    def reset(self):
+        self._typed = ""
+        self._held.clear()
+
+    def feed_char(self, ch):
+        """Append one typed character; returns (hotkey, typed length) when an abbreviation was completed."""
+        typed = (self._typed + ch.lower())[-self.max_len:]
+        self._typed = typed
+        abbrs = self._abbrs
+        for n in self._lengths:
+            key = abbrs.get(typed[-n:])
+            if key is not None:
+                # Typed text after an expansion must not re-complete the same abbreviation
+                self._typed = ""
+                return key, n
+        return None
+
+    def feed(self, name, is_down=True):
+        """Process a key event by `keyboard` event name; returns (hotkey, typed length) or None."""
+        if not name:
+            return None
+        if name in SHORTCUT_MODIFIERS:
+            if is_down:
+                self._held.add(name)
+            else:
+                self._held.discard(name)
+            self._typed = ""
+            return None
+        if not is_down:
+            return None
+        if self._held:
+            return None
+        if len(name) == 1:
+            return self.feed_char(name)
+        ch = CHAR_NAMES.get(name)
+        if ch is not None:
+            return self.feed_char(ch)
+        if name == 'backspace':
+            self._typed = self._typed[:-1]
+        elif name not in MODIFIER_KEYS:
+            # Enter, tab, arrows, ...: whatever was typed is no longer contiguous
+            self._typed = ""
+        return None
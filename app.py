@@ -1,132 +1,112 @@
+import time
+# Taken before the Qt imports so startup timings include them
+STARTUP_T0 = time.perf_counter()
 import sys
 import ctypes
 import signal
-import time
 import os
-import shutil
-import json
-import pyperclip
-import keyboard
+import argparse
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QLineEdit, QPushButton, 
-                             QTableWidget, QTableWidgetItem, QHeaderView, 
+                             QTableView, QTableWidget, QTableWidgetItem, QHeaderView,
                              QSystemTrayIcon, QMenu, QMessageBox, QAbstractItemView,
                              QCheckBox, QGroupBox, QFileDialog, QListWidget, 
-                             QTabWidget, QComboBox, QSplitter, QDoubleSpinBox, QListWidgetItem)
-from PyQt6.QtGui import QIcon, QAction, QImage
-from PyQt6.QtCore import Qt, QTimer, QSize, QEventLoop, QObject, pyqtSignal, QEvent
+                             QTabWidget, QComboBox, QSplitter, QDoubleSpinBox, QListWidgetItem,
+                             QProgressBar)
+from PyQt6.QtGui import QIcon, QAction
+from PyQt6.QtCore import Qt, QTimer, QSize, pyqtSlot, QEvent
+from executor import SequenceExecutor, POLICIES, DEFAULT_POLICY
+from hotkey_service import HotkeyService, PALETTE_HOTKEY, STORAGE_BACKEND
+from hotkey_model import HotkeyTableModel
+from sequence_plan import compile_actions
+from templates import placeholders
+from config_model import Action
+from abbreviations import AbbreviationMatcher, ABBR_KEY_PREFIX
+from palette import PaletteDialog
+from tracing import METRICS, StartupTimer
 
 # Allow Ctrl+C to kill the app
 signal.signal(signal.SIGINT, signal.SIG_DFL)
 
-CONFIG_FILE = "config.json"
-
-class HotkeyService(QObject):
-    # Signal now emits a list of actions: [{'type': '...', 'value': '...'}, ...]
-    paste_requested = pyqtSignal(list)
-
-    def __init__(self):
-        super().__init__()
-        self.hotkeys = {}
-        self.load_config()
-        self.is_listening = False
-
-    def normalize_key(self, key_combo):
-        if not key_combo:
-            return ""
-        return key_combo.lower().replace(" ", "")
-
-    def load_config(self):
-        """Load hotkeys, supporting migration to v4 (dict with tag and actions)."""
-        if os.path.exists(CONFIG_FILE):
-            try:
-                with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                    raw_data = json.load(f)
-                    
-                    self.hotkeys = {}
-                    for k, v in raw_data.items():
-                        norm_k = self.normalize_key(k)
-                        final_data = {'tag': '', 'actions': []}
-
-                        if isinstance(v, dict) and 'actions' in v:
-                            final_data = v
-                        elif isinstance(v, list):
-                            final_data['actions'] = v
-                        elif isinstance(v, dict) and 'type' in v:
-                            final_data['actions'] = [v]
-                        elif isinstance(v, str):
-                            final_data['actions'] = [{'type': 'text', 'value': v}]
-                            
-                        self.hotkeys[norm_k] = final_data
-            except Exception as e:
-                print(f"Error loading config: {e}")
-                self.hotkeys = {}
-        else:
-            self.hotkeys = {}
-
-    def save_config(self):
-        try:
-            with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.hotkeys, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print(f"Error saving config: {e}")
-
-    def add_hotkey(self, key_combo, actions, tag=""):
-        key = self.normalize_key(key_combo)
-        self.hotkeys[key] = {'tag': tag, 'actions': actions}
-        self.save_config()
-        self.restart_listening()
-
-    def remove_hotkey(self, key_combo):
-        key = self.normalize_key(key_combo)
-        if key in self.hotkeys:
-            del self.hotkeys[key]
-            self.save_config()
-            self.restart_listening()
-
-    def trigger_sequence(self, actions):
-        self.paste_requested.emit(actions)
-
-    def start_listening(self):
-        try:
-            keyboard.unhook_all()
-        except:
-            pass
-
-        for key, data in self.hotkeys.items():
-            if not key or key.strip() == "":
-                continue
-            try:
-                actions = data.get('actions', [])
-                if actions:
-                    keyboard.add_hotkey(key, lambda a=actions: self.trigger_sequence(a), suppress=True)
-            except Exception as e:
-                print(f"Failed to register hotkey '{key}': {e}")
-        
-        self.is_listening = True
-
-    def stop_listening(self):
-        try:
-            keyboard.unhook_all()
-        except:
-            pass
-        self.is_listening = False
+# Time for focus to return to the previous window after the palette closes
+PALETTE_RUN_DELAY_MS = 150
+# Above this many keys changed by a config reload, a full table reset beats per-row updates
+TABLE_RELOAD_THRESHOLD = 500
 
-    def restart_listening(self):
-        self.start_listening()
+POLICY_LABELS = {
+    "queue": "排隊執行",
+    "drop": "執行中忽略",
+    "restart": "重新開始",
+    "coalesce": "合併重複",
+}
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, service=None, executor=None, startup=None, daemon=None, tray=False):
+        """`tray`: started from the tray (--tray); closing the window then only hides it."""
         super().__init__()
         self.setWindowTitle("QuickPaste v3.1 - 可自訂延遲版")
         self.resize(1000, 700)
         self.is_quitting = False
+        self.tray_mode = tray
+        self.ui_built = False
+        self.startup = startup or StartupTimer()
+
+        # Initialize Service; playback runs on the executor's own thread
+        if service is None:
+            self.startup.mark('imports')
+            service = HotkeyService(passive=daemon is not None)
+            self.startup.mark('config')
+        self.service = service
+        self.executor = executor or SequenceExecutor(self.service.image_cache)
+        self.daemon = daemon
+        if daemon is None:
+            self.executor.sequence_started.connect(self.on_sequence_started)
+            self.executor.sequence_finished.connect(self.on_sequence_finished)
+            self.executor.sequence_cancelled.connect(self.on_sequence_cancelled)
+            self.executor.trigger_dropped.connect(self.on_trigger_dropped)
+            self.executor.sequence_progress.connect(self.on_sequence_progress)
+            self.service.paste_requested.connect(self.executor.submit)
+            self.service.cancel_requested.connect(self.executor.cancel)
+            self.executor.start()
+            self.service.start_listening()
+        else:
+            # Client of daemon.py: it owns the hooks and playback, we only edit config.json
+            self.daemon.event_received.connect(self.on_daemon_event)
+            self.daemon.subscribe()
+            self.service.cancel_requested.connect(lambda: self.call_daemon('cancel'))
+        self.startup.mark('hotkeys')
 
-        # Initialize Service
-        self.service = HotkeyService()
-        self.service.paste_requested.connect(self.handle_sequence_request)
-        self.service.start_listening()
-
+        # Hotkeys work from here on; the editor is built the first time the window opens
+        self.setup_tray()
+        if self.daemon is not None:
+            state = self.call_daemon('ping')
+            if state and state.get('ok'):
+                self.show_user_pause(bool(state.get('user')), state.get('paused', False))
+        self.service.pause_changed.connect(self.on_pause_changed)
+        self.service.palette_requested.connect(self.open_palette)
+        self.service.hotkeys_changed.connect(self.on_hotkeys_changed)
+        self.palette = None  # built on first use
+        QApplication.instance().aboutToQuit.connect(self.shutdown)
+        self.startup.mark('tray')
+        print(f"Startup: {self.startup.summary()}")
+        self.tray_tooltip = f"QuickPaste (啟動 {self.startup.total_ms():.0f} ms)"
+        self.tray_icon.setToolTip(self.tray_tooltip)
+
+    def setVisible(self, visible):
+        # show(), showNormal() and the tray actions all end up here
+        if visible:
+            self.ensure_ui()
+        super().setVisible(visible)
+
+    def ensure_ui(self):
+        if self.ui_built:
+            return
+        self.ui_built = True
+        self.build_ui()
+        self.startup.mark('ui')
+        self.status_label.setToolTip(f"啟動: {self.startup.summary()}")
+
+    def build_ui(self):
         # UI Setup
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -142,17 +122,23 @@ class MainWindow(QMainWindow):
         lbl_list = QLabel("已設定的快捷鍵 (💡 雙擊「備註」欄位可直接修改)")
         lbl_list.setStyleSheet("font-weight: bold; color: #555;")
         
-        self.table = QTableWidget()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["快捷鍵", "備註", "動作數"])
-        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
+        self.txt_filter = QLineEdit()
+        self.txt_filter.setPlaceholderText("🔍 搜尋快捷鍵、備註或文字內容...")
+        self.txt_filter.setClearButtonEnabled(True)
+
+        self.model = HotkeyTableModel(self.service, self)
+        self.txt_filter.textChanged.connect(self.model.set_filter)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
+        # Fixed widths: ResizeToContents measures every row on each reset
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.setColumnWidth(0, 140)
+        self.table.setColumnWidth(2, 60)
         self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked | QAbstractItemView.EditTrigger.EditKeyPressed)
-        self.table.itemClicked.connect(self.on_table_click)
-        self.table.itemChanged.connect(self.on_table_item_changed)
+        self.table.clicked.connect(self.on_table_click)
         
         btn_layout = QHBoxLayout()
         self.btn_new = QPushButton("✨ 新增")
@@ -164,6 +150,7 @@ class MainWindow(QMainWindow):
         btn_layout.addWidget(self.btn_del)
 
         left_layout.addWidget(lbl_list)
+        left_layout.addWidget(self.txt_filter)
         left_layout.addWidget(self.table)
         left_layout.addLayout(btn_layout)
 
@@ -188,6 +175,22 @@ class MainWindow(QMainWindow):
         k_row.addWidget(self.key_input)
         k_row.addStretch()
         key_layout.addLayout(k_row)
+        a_row = QHBoxLayout()
+        self.txt_abbr = QLineEdit()
+        self.txt_abbr.setPlaceholderText("如: ;addr")
+        self.txt_abbr.setFixedWidth(120)
+        a_row.addWidget(QLabel("或輸入縮寫觸發:"))
+        a_row.addWidget(self.txt_abbr)
+        a_row.addStretch()
+        key_layout.addLayout(a_row)
+        p_row = QHBoxLayout()
+        self.cmb_policy = QComboBox()
+        for p in POLICIES:
+            self.cmb_policy.addItem(POLICY_LABELS[p], p)
+        p_row.addWidget(QLabel("執行中再次觸發:"))
+        p_row.addWidget(self.cmb_policy)
+        p_row.addStretch()
+        key_layout.addLayout(p_row)
         key_group.setLayout(key_layout)
 
         seq_group = QGroupBox("2. 編輯動作序列")
@@ -231,7 +234,7 @@ class MainWindow(QMainWindow):
         tab_text = QWidget()
         t_layout = QHBoxLayout(tab_text)
         self.txt_input = QLineEdit()
-        self.txt_input.setPlaceholderText("輸入文字...")
+        self.txt_input.setPlaceholderText("輸入文字... (可用 {date:%Y-%m-%d}、{clipboard}、{counter:名稱}、{env:變數})")
         btn_add_t = QPushButton("加入文字")
         btn_add_t.clicked.connect(self.add_text_step)
         t_layout.addWidget(self.txt_input)
@@ -276,7 +279,12 @@ class MainWindow(QMainWindow):
         right_layout.addWidget(add_group)
         right_layout.addWidget(self.btn_save)
 
-        splitter.addWidget(left_panel)
+        self.left_tabs = QTabWidget()
+        self.left_tabs.addTab(left_panel, "📋 快捷鍵")
+        self.left_tabs.addTab(self.build_stats_tab(), "📊 統計")
+        self.left_tabs.currentChanged.connect(lambda i: self.refresh_stats() if i == 1 else None)
+
+        splitter.addWidget(self.left_tabs)
         splitter.addWidget(right_panel)
         splitter.setStretchFactor(1, 2)
 
@@ -291,7 +299,17 @@ class MainWindow(QMainWindow):
         self.btn_quit.clicked.connect(self.quit_app)
         self.btn_quit.setStyleSheet("color: red;")
         
+        # Shown only while a large text is pasted in chunks
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(160)
+        self.progress_bar.hide()
+        self.btn_cancel = QPushButton("⏹ 停止")
+        self.btn_cancel.clicked.connect(self.service.cancel_requested.emit)
+        self.btn_cancel.hide()
+
         bottom_bar.addWidget(self.status_label)
+        bottom_bar.addWidget(self.progress_bar)
+        bottom_bar.addWidget(self.btn_cancel)
         bottom_bar.addStretch()
         bottom_bar.addWidget(self.btn_reload)
         bottom_bar.addWidget(self.btn_quit)
@@ -300,36 +318,114 @@ class MainWindow(QMainWindow):
         layout_container.addWidget(splitter)
         layout_container.addLayout(bottom_bar)
         self.central_widget.setLayout(layout_container)
-        
-        self.setup_tray()
-        self.refresh_table()
 
+        self.refresh_table()
         QApplication.instance().focusChanged.connect(self.on_focus_changed)
 
+    def build_stats_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.stats_table = QTableWidget()
+        self.stats_table.setColumnCount(7)
+        self.stats_table.setHorizontalHeaderLabels(["快捷鍵", "項目", "次數", "p50 ms", "p95 ms", "p99 ms", "最大 ms"])
+        self.stats_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.stats_table.verticalHeader().setVisible(False)
+        btn_row = QHBoxLayout()
+        btn_refresh = QPushButton("🔄 重新整理")
+        btn_refresh.clicked.connect(self.refresh_stats)
+        btn_export = QPushButton("📤 匯出 Chrome Trace")
+        btn_export.clicked.connect(self.export_trace)
+        btn_clear = QPushButton("🧹 清除")
+        btn_clear.clicked.connect(lambda: (self.executor.tracer.clear(), self.refresh_stats()))
+        btn_row.addWidget(btn_refresh)
+        btn_row.addWidget(btn_export)
+        btn_row.addWidget(btn_clear)
+        layout.addWidget(self.stats_table)
+        layout.addLayout(btn_row)
+        return tab
+
+    def refresh_stats(self):
+        rows = []
+        for key, metrics in sorted(self.executor.tracer.stats().items()):
+            name = key or "(臨時)"
+            for metric in METRICS:
+                if metric in metrics:
+                    m = metrics[metric]
+                    rows.append([name, metric, str(m['count'])] +
+                                [f"{m[c]:.2f}" for c in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')])
+            if metrics.get('errors'):
+                rows.append([name, "errors", str(metrics['errors']), "", "", "", ""])
+        self.stats_table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, text in enumerate(row):
+                self.stats_table.setItem(r, c, QTableWidgetItem(text))
+
+    def export_trace(self):
+        fname, _ = QFileDialog.getSaveFileName(self, "匯出 Chrome Trace", "quickpaste_trace.json", "JSON (*.json)")
+        if fname:
+            try:
+                self.executor.tracer.export_chrome_trace(fname)
+                self.status_label.setText(f"已匯出: {os.path.basename(fname)}")
+            except Exception as e:
+                QMessageBox.warning(self, "匯出失敗", str(e))
+
+    def set_status(self, text):
+        # Executor and pause signals also arrive while only the tray exists
+        if self.ui_built:
+            self.status_label.setText(text)
+
     def on_reload_click(self):
-        self.service.restart_listening()
-        self.status_label.setText("快捷鍵已重載 ✓")
+        self.service.reload()
+        st = self.service.registration_stats()
+        self.status_label.setText(f"快捷鍵已重載 ✓ ({st['registered']} 個，註冊共 {st['total_ms']:.1f} ms)")
         QTimer.singleShot(2000, lambda: self.status_label.setText("就緒"))
 
     def on_focus_changed(self, old, new):
         if new and (isinstance(new, QLineEdit) or isinstance(new, QDoubleSpinBox) or isinstance(new, QComboBox)):
-            if self.service.is_listening:
-                self.service.stop_listening()
+            if not self.service.is_paused('editor'):
+                self.service.pause('editor')
                 self.status_label.setText("輸入模式 (快捷鍵暫停)")
+        elif self.service.is_paused('editor'):
+            self.service.resume('editor')
+            self.status_label.setText("就緒")
+
+    @pyqtSlot(bool)
+    def on_pause_changed(self, paused):
+        if self.daemon is not None:
+            # Typing in the editor must not fire the daemon's hotkeys either; its own reason
+            # keeps leaving the editor from lifting a pause a script asked for
+            self.call_daemon('pause' if paused else 'resume', reason='editor')
+            return
+        self.show_user_pause(self.service.is_paused('user'), paused)
+
+    def show_user_pause(self, user_paused, paused):
+        self.act_pause.setChecked(user_paused)
+        if user_paused:
+            self.set_status("快捷鍵已暫停")
+        elif not paused:
+            self.set_status("就緒")
+
+    def set_user_pause(self, checked):
+        # The tray toggle; a client pauses the daemon the same way Ctrl+Alt+P does
+        if self.daemon is not None:
+            self.call_daemon('pause' if checked else 'resume', reason='user')
+        elif checked:
+            self.service.pause('user')
         else:
-            if not self.service.is_listening:
-                self.service.restart_listening()
-                self.status_label.setText("就緒")
+            self.service.resume('user')
 
     def on_tab_changed(self, index):
         if index == 0: self.spin_delay.setValue(0.3)
         elif index == 1: self.spin_delay.setValue(0.1)
         elif index == 2: self.spin_delay.setValue(1.5)
 
-    def add_step_to_list(self, a_type, value, display, delay):
+    def add_step_to_list(self, a_type, value, display, delay, data=None):
+        if len(display) > 80:
+            display = display[:80] + ".."
         item_text = f"[{a_type.upper()}] {display} (wait {delay}s)"
         l_item = QListWidgetItem(item_text)
-        l_item.setData(Qt.ItemDataRole.UserRole, {'type': a_type, 'value': value, 'delay': delay})
+        l_item.setData(Qt.ItemDataRole.UserRole, data or Action(a_type, value, delay))
         self.seq_list.addItem(l_item)
         self.seq_list.scrollToBottom()
 
@@ -382,20 +478,26 @@ class MainWindow(QMainWindow):
         return "+".join(parts)
 
     def save_hotkey(self):
-        key = self.get_key_string()
+        abbr = self.txt_abbr.text().strip()
+        if abbr:
+            err = AbbreviationMatcher.check(abbr)
+            if err:
+                self.status_label.setText(f"縮寫無效: {err}")
+                return
+        # Without a chord the entry is triggered by its abbreviation only
+        key = self.get_key_string() or (ABBR_KEY_PREFIX + abbr.lower() if abbr else None)
         if not key or self.seq_list.count() == 0: return
         actions = []
         for i in range(self.seq_list.count()):
             data = self.seq_list.item(i).data(Qt.ItemDataRole.UserRole)
-            if data['type'] == 'image':
-                src = data['value']
-                if "images" not in src and os.path.exists(src):
+            if data.type == 'image':
+                src = data.value
+                if os.path.exists(src):
                     try:
-                        if not os.path.exists("images"): os.makedirs("images")
-                        dest = os.path.join("images", f"{int(time.time())}_{os.path.basename(src)}")
-                        shutil.copy2(src, dest)
-                        data['value'] = dest
-                    except: pass
+                        # Same content always maps to the same stored file
+                        data = data.replace(value=self.service.images.import_file(src))
+                    except OSError as e:
+                        print(f"Error storing image {src}: {e}")
             actions.append(data)
         
         # Smart Tag Generation
@@ -405,10 +507,12 @@ class MainWindow(QMainWindow):
         if not current_tag.strip():
             summary_parts = []
             for act in actions:
-                if act['type'] == 'text':
-                    # Truncate text to 6 chars
-                    t_val = act['value']
-                    if len(t_val) > 6: t_val = t_val[:6] + ".."
+                if act['type'] == 'text' and 'file' in act:
+                    summary_parts.append("文[📄]")
+                elif act['type'] == 'text':
+                    # Templates are summarized by their placeholders, plain text truncated to 6 chars
+                    t_val = "".join(placeholders(act['value'])) or act['value']
+                    if len(t_val) > 6 and not t_val.startswith('{'): t_val = t_val[:6] + ".."
                     summary_parts.append(f"文[{t_val}]")
                 elif act['type'] == 'key':
                     summary_parts.append(f"按[{act['value']}]")
@@ -420,104 +524,180 @@ class MainWindow(QMainWindow):
             if len(full_summary) > 40: full_summary = full_summary[:40] + "..."
             current_tag = full_summary
         
-        self.service.add_hotkey(key, actions, current_tag)
-        self.refresh_table()
+        self.service.add_hotkey(key, actions, current_tag, self.cmb_policy.currentData(), abbr)
+        self.model.upsert(key)
         self.reset_editor()
-        self.status_label.setText(f"已儲存: {key}")
+        errors = self.service.plan(key).errors
+        if errors:
+            self.status_label.setText(f"已儲存: {key} ⚠ {errors[0]}")
+        else:
+            self.status_label.setText(f"已儲存: {key}")
 
     def delete_hotkey(self):
-        row = self.table.currentRow()
-        if row >= 0:
-            key = self.table.item(row, 0).text()
+        key = self.model.key_at(self.table.currentIndex().row())
+        if key is not None:
             if QMessageBox.question(self, "刪除", f"確認刪除 {key}?") == QMessageBox.StandardButton.Yes:
                 self.service.remove_hotkey(key)
-                self.refresh_table()
+                self.model.remove(key)
                 self.reset_editor()
 
-    def on_table_click(self, item):
-        key = self.table.item(item.row(), 0).text()
+    def on_table_click(self, index):
+        key = self.model.key_at(index.row())
+        if key is None:
+            return
         data = self.service.hotkeys.get(key, {'tag': '', 'actions': []})
         self.reset_editor()
-        parts = key.split('+')
+        self.txt_abbr.setText(data.get('abbr', ''))
+        parts = [] if key.startswith(ABBR_KEY_PREFIX) else key.split('+')
         self.chk_ctrl.setChecked('ctrl' in parts)
         self.chk_shift.setChecked('shift' in parts)
         self.chk_alt.setChecked('alt' in parts)
         mods = ['ctrl','shift','alt']
         main = [p for p in parts if p not in mods]
         if main: self.key_input.setText(main[0])
+        self.cmb_policy.setCurrentIndex(max(0, self.cmb_policy.findData(data.get('policy', DEFAULT_POLICY))))
         for act in data.get('actions', []):
             delay = act.get('delay', 0.5 if act['type']=='image' else 0.1)
-            self.add_step_to_list(act['type'], act['value'], act['value'], delay)
-
-    def on_table_item_changed(self, item):
-        if item.column() == 1:
-            row = item.row()
-            key_item = self.table.item(row, 0)
-            if key_item:
-                key = key_item.text()
-                if key in self.service.hotkeys:
-                    self.service.hotkeys[key]['tag'] = item.text()
-                    self.service.save_config()
+            if 'file' in act:
+                # Large text stays in its side file; the step is kept as is
+                self.add_step_to_list(act['type'], None, f"📄 大型文字 ({act.get('chars', 0) // 1024} KB)",
+                                      delay, act.replace(delay=delay))
+            else:
+                # The stored Action is reused so fields the editor does not show survive a save
+                self.add_step_to_list(act['type'], act['value'], act['value'], delay, act.replace(delay=delay))
 
     def reset_editor(self):
         self.chk_ctrl.setChecked(False)
         self.chk_shift.setChecked(False)
         self.chk_alt.setChecked(False)
         self.key_input.clear()
+        self.txt_abbr.clear()
+        self.cmb_policy.setCurrentIndex(self.cmb_policy.findData(DEFAULT_POLICY))
         self.seq_list.clear()
         self.txt_input.clear()
         self.lbl_img.clear()
 
     def refresh_table(self):
-        self.table.blockSignals(True)
-        self.table.setRowCount(0)
-        for k, v in self.service.hotkeys.items():
-            r = self.table.rowCount()
-            self.table.insertRow(r)
-            item_key = QTableWidgetItem(k)
-            item_key.setFlags(item_key.flags() ^ Qt.ItemFlag.ItemIsEditable)
-            self.table.setItem(r, 0, item_key)
-            self.table.setItem(r, 1, QTableWidgetItem(v.get('tag', '')))
-            actions = v.get('actions', [])
-            item_count = QTableWidgetItem(str(len(actions)))
-            item_count.setFlags(item_count.flags() ^ Qt.ItemFlag.ItemIsEditable)
-            self.table.setItem(r, 2, item_count)
-        self.table.blockSignals(False)
-
-    def safe_wait(self, seconds):
-        loop = QEventLoop()
-        QTimer.singleShot(int(seconds * 1000), loop.quit)
-        loop.exec()
-
-    def handle_sequence_request(self, actions):
-        self.status_label.setText("執行中...")
-        clipboard = QApplication.clipboard()
-        for act in actions:
-            delay = act.get('delay', 0.5) 
-            try:
-                if act['type'] == 'text':
-                    pyperclip.copy(act['value'])
-                    self.safe_wait(0.05)
-                    keyboard.send('ctrl+v')
-                elif act['type'] == 'key':
-                    keyboard.send(act['value'])
-                elif act['type'] == 'image':
-                    if os.path.exists(act['value']):
-                        img = QImage(act['value'])
-                        if not img.isNull():
-                            clipboard.setImage(img)
-                            self.safe_wait(0.1)
-                            keyboard.send('ctrl+v')
-            except: pass
-            self.safe_wait(delay)
+        self.model.reload()
+
+    # Executor signals arrive from the worker thread; slots keep them queued to the GUI
+    @pyqtSlot(str)
+    def on_sequence_started(self, key):
+        self.set_status("執行中...")
+
+    @pyqtSlot(str, int, int)
+    def on_sequence_progress(self, key, done, total):
+        pct = done * 100 // total if total else 100
+        self.tray_icon.setToolTip(f"QuickPaste: 大量貼上 {key} {pct}%")
+        if not self.ui_built:
+            return
+        self.status_label.setText(f"大量貼上中... {done // 1024} / {total // 1024} KB")
+        self.progress_bar.setValue(pct)
+        self.progress_bar.show()
+        self.btn_cancel.show()
+
+    def end_progress(self):
+        self.tray_icon.setToolTip(self.tray_tooltip)
+        if self.ui_built:
+            self.progress_bar.hide()
+            self.btn_cancel.hide()
+
+    @pyqtSlot(str)
+    def on_sequence_finished(self, key):
+        self.end_progress()
+        if not self.ui_built:
+            return
         self.status_label.setText("完成")
+        st = self.service.image_cache.stats()
+        self.status_label.setToolTip(
+            f"圖片快取: 命中 {st['hits']} / 未命中 {st['misses']}，"
+            f"{st['entries']} 張 {st['bytes'] // 1024} KB")
+
+    @pyqtSlot(str)
+    def on_sequence_cancelled(self, key):
+        self.end_progress()
+        self.set_status("已取消")
+
+    @pyqtSlot(str)
+    def on_trigger_dropped(self, key):
+        self.set_status(f"執行中，已略過: {key}")
+
+    def on_hotkeys_changed(self, keys):
+        if not self.ui_built:
+            return
+        if len(keys) > TABLE_RELOAD_THRESHOLD:
+            self.model.reload()
+        else:
+            for key in keys:
+                if key in self.service.hotkeys:
+                    self.model.upsert(key)
+                else:
+                    self.model.remove(key)
+        self.status_label.setText(f"設定檔已更新 ({len(keys)} 個快捷鍵)")
+
+    @pyqtSlot()
+    def open_palette(self):
+        if self.palette is None:
+            self.palette = PaletteDialog(self.service)
+            self.palette.chosen.connect(self.run_palette_choice)
+        self.palette.popup()
+
+    def run_palette_choice(self, key):
+        actions = self.service.hotkeys.get(key, {}).get('actions', [])
+        QTimer.singleShot(PALETTE_RUN_DELAY_MS, lambda: self.handle_sequence_request(actions, key))
+
+    def handle_sequence_request(self, actions, key=""):
+        if self.daemon is not None:
+            # The daemon records usage for what it plays
+            if key:
+                self.call_daemon('trigger', key=key)
+            else:
+                self.call_daemon('run', actions=actions)
+            return
+        # Queued onto the executor thread; never blocks the GUI
+        if key and self.service.run_hotkey(key):
+            return
+        self.service.paste_requested.emit(key, compile_actions(actions), DEFAULT_POLICY, time.perf_counter())
+
+    def call_daemon(self, cmd, **fields):
+        try:
+            reply = self.daemon.request(cmd, **fields)
+        except ConnectionError as e:
+            self.set_status("背景服務未回應")
+            print(e)
+            return None
+        if not reply.get('ok'):
+            self.set_status(f"背景服務錯誤: {reply.get('error')}")
+        return reply
+
+    def on_daemon_event(self, msg):
+        key = msg.get('key', '')
+        handler = {
+            'started': self.on_sequence_started,
+            'finished': self.on_sequence_finished,
+            'cancelled': self.on_sequence_cancelled,
+            'dropped': self.on_trigger_dropped,
+        }.get(msg['event'])
+        if handler is not None:
+            handler(key)
+        elif msg['event'] == 'progress':
+            self.on_sequence_progress(key, msg.get('done', 0), msg.get('total', 0))
+        elif msg['event'] == 'palette':
+            self.open_palette()
+        elif msg['event'] == 'paused':
+            self.show_user_pause(bool(msg.get('user')), msg.get('paused', False))
 
     def setup_tray(self):
         self.tray_icon = QSystemTrayIcon(self)
         self.tray_icon.setIcon(self.style().standardIcon(self.style().StandardPixmap.SP_ComputerIcon))
         menu = QMenu()
         menu.addAction("顯示主視窗", self.show)
-        menu.addAction("🔄 重載快捷鍵", self.service.restart_listening)
+        menu.addAction(f"🔍 搜尋並執行... ({PALETTE_HOTKEY})", self.open_palette)
+        menu.addAction("🔄 重載快捷鍵", self.service.reload)
+        menu.addAction("⏹ 停止執行", self.service.cancel_requested.emit)
+        self.act_pause = menu.addAction("⏸ 暫停所有快捷鍵")
+        self.act_pause.setCheckable(True)
+        self.act_pause.triggered.connect(self.set_user_pause)
         menu.addSeparator()
         menu.addAction("結束程式", self.quit_app)
         self.tray_icon.setContextMenu(menu)
@@ -525,6 +705,11 @@ class MainWindow(QMainWindow):
         self.tray_icon.activated.connect(lambda r: self.show() if r == QSystemTrayIcon.ActivationReason.DoubleClick else None)
 
     def closeEvent(self, e):
+        if self.tray_mode and not self.is_quitting:
+            # Started at login: the hotkeys keep running until 結束程式 in the tray menu
+            e.ignore()
+            self.hide()
+            return
         self.service.stop_listening()
         e.accept()
 
@@ -533,10 +718,40 @@ class MainWindow(QMainWindow):
         self.service.stop_listening()
         QApplication.instance().quit()
 
+    def shutdown(self):
+        # Runs on every exit path, so pending config writes are never lost
+        self.executor.shutdown()
+        self.service.close()
+        if self.daemon is not None:
+            self.daemon.close()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="QuickPaste")
+    parser.add_argument("--tray", action="store_true",
+                        help="start in the system tray; the editor is built when first opened")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default=STORAGE_BACKEND,
+                        help="sqlite keeps hotkeys in config.db (imported from config.json on first run)")
+    parser.add_argument("--client", action="store_true",
+                        help="edit only; hotkeys and playback are left to a running daemon.py")
+    args = parser.parse_args()
+    if args.client and args.storage != "json":
+        # The daemon only notices edits through its config.json watcher
+        parser.error("--client works with --storage json only")
     app = QApplication(sys.argv)
-    app.setQuitOnLastWindowClosed(True)
+    app.setQuitOnLastWindowClosed(not args.tray)
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    window = MainWindow()
-    window.show()
+    startup = StartupTimer(STARTUP_T0)
+    startup.mark('imports')
+    service = HotkeyService(storage=args.storage, passive=args.client)
+    startup.mark('config')
+    daemon = None
+    if args.client:
+        from daemon import DaemonClient
+        daemon = DaemonClient()
+        if not daemon.is_running():
+            print("QuickPaste daemon is not running; start it with: python daemon.py")
+            sys.exit(1)
+    window = MainWindow(service=service, startup=startup, daemon=daemon, tray=args.tray)
+    if not args.tray:
+        window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""Pluggable OS backends: key injection, clipboard and keyboard hooks.
+
+The real implementations wrap `keyboard`, `pyperclip` and QClipboard. The
+in-memory fakes let the service and executor run headless (benchmarks, CI
+under QT_QPA_PLATFORM=offscreen) and record what would have been sent.
+"""
+import time
+import threading
+
+import keyboard
+import pyperclip
+from PyQt6.QtGui import QImage, QGuiApplication
+from PyQt6.QtCore import Qt, QObject, pyqtSignal, pyqtSlot
+
+
+class KeyboardInjector:
+    def send(self, keys):
+        keyboard.send(keys)
+
+
+class SystemClipboard(QObject):
+    """Text through pyperclip (any thread); images through QClipboard on the GUI thread.
+
+    Create it on the GUI thread. `set_image` may be called from any thread and
+    is queued, never blocking, so a worker cannot deadlock against a busy GUI;
+    `image_ready(serial)` turns true once the clipboard holds that image.
+    """
+    _image_requested = pyqtSignal(QImage, int)
+
+    def __init__(self):
+        super().__init__()
+        self._serial = 0
+        self._ready_serial = 0
+        self._image_requested.connect(self._apply_image, Qt.ConnectionType.QueuedConnection)
+
+    def set_text(self, text):
+        pyperclip.copy(text)
+
+    def text(self):
+        return pyperclip.paste()
+
+    def set_image(self, img):
+        self._serial += 1
+        self._image_requested.emit(img, self._serial)
+        return self._serial
+
+    def image_ready(self, serial):
+        return self._ready_serial >= serial
+
+    @pyqtSlot(QImage, int)
+    def _apply_image(self, img, serial):
+        clipboard = QGuiApplication.clipboard()
+        clipboard.setImage(img)
+        if clipboard.mimeData().hasImage():
+            self._ready_serial = serial
+
+
+class KeyboardHookSource:
+    """The subset of the `keyboard` module the service registers hooks through."""
+
+    def add_hotkey(self, key, callback, suppress=False):
+        return keyboard.add_hotkey(key, callback, suppress=suppress)
+
+    def remove_hotkey(self, handle):
+        keyboard.remove_hotkey(handle)
+
+    def hook(self, callback, suppress=False):
+        return keyboard.hook(callback, suppress=suppress)
+
+    def unhook(self, handle):
+        keyboard.unhook(handle)
+
+    def unhook_all(self):
+        keyboard.unhook_all()
+
+
+class FakeInjector:
+    """Records every send as (perf_counter time, keys); `on_send` can observe them."""
+
+    def __init__(self, on_send=None):
+        self.sent = []
+        self.on_send = on_send
+
+    def send(self, keys):
+        self.sent.append((time.perf_counter(), keys))
+        if self.on_send is not None:
+            self.on_send(keys)
+
+
+class FakeClipboard:
+    def __init__(self):
+        self._text = ""
+        self.image = None
+        self.writes = 0
+        self._serial = 0
+
+    def set_text(self, text):
+        self._text = text
+        self.writes += 1
+
+    def text(self):
+        return self._text
+
+    def set_image(self, img):
+        self.image = img
+        self.writes += 1
+        self._serial += 1
+        return self._serial
+
+    def image_ready(self, serial):
+        return self._serial >= serial
+
+
+class FakeHookSource:
+    """Keeps registered callbacks in memory; `press(key)` fires one like the OS hook would."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hotkeys = {}   # handle -> (key, callback)
+        self.hooks = {}     # handle -> callback
+        self._next = 0
+
+    def _handle(self):
+        self._next += 1
+        return self._next
+
+    def add_hotkey(self, key, callback, suppress=False):
+        with self._lock:
+            handle = self._handle()
+            self.hotkeys[handle] = (key, callback)
+        return handle
+
+    def remove_hotkey(self, handle):
+        with self._lock:
+            del self.hotkeys[handle]
+
+    def hook(self, callback, suppress=False):
+        with self._lock:
+            handle = self._handle()
+            self.hooks[handle] = callback
+        return handle
+
+    def unhook(self, handle):
+        with self._lock:
+            del self.hooks[handle]
+
+    def unhook_all(self):
+        with self._lock:
+            self.hotkeys.clear()
+            self.hooks.clear()
+
+    def press(self, key):
+        """Invoke the callback registered for `key`; returns what it returned (None if unbound)."""
+        with self._lock:
+            callbacks = [cb for k, cb in self.hotkeys.values() if k == key]
+        result = None
+        for cb in callbacks:
+            result = cb()
+        return result
+
+    def feed(self, event):
+        with self._lock:
+            callbacks = list(self.hooks.values())
+        return all(cb(event) for cb in callbacks)
@@ -0,0 +1,94 @@
+"""Per-keystroke cost of AbbreviationMatcher from 10 to 10,000 abbreviations.
+
+Replays a typed corpus (words, spaces, the odd backspace and some
+abbreviations) as `keyboard` event names through `AbbreviationMatcher.feed`.
+
+    python benchmarks/bench_abbrev.py
+"""
+import os
+import sys
+import random
+import string
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from abbreviations import AbbreviationMatcher
+
+
+def make_abbreviations(n, rng):
+    """n distinct ';word' style abbreviations of 3 to 8 letters."""
+    abbrs = set()
+    while len(abbrs) < n:
+        length = rng.randint(3, 8)
+        abbrs.add(";" + "".join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    return sorted(abbrs)
+
+
+def make_corpus(rng, abbrs, words=20000, abbr_ratio=0.02):
+    """Event names for `words` typed words; a few of them are abbreviations from `abbrs`."""
+    names = []
+    for _ in range(words):
+        if abbrs and rng.random() < abbr_ratio:
+            word = rng.choice(abbrs)
+        else:
+            word = "".join(rng.choice(string.ascii_letters + ".,;") for _ in range(rng.randint(1, 10)))
+        names.extend(word)
+        if rng.random() < 0.05:
+            names.append('backspace')
+        names.append('space' if rng.random() < 0.9 else 'enter')
+    return names
+
+
+def _replay(names, matcher):
+    matcher.reset()
+    feed = matcher.feed
+    hits = 0
+    start = time.perf_counter()
+    for name in names:
+        if feed(name) is not None:
+            hits += 1
+    return time.perf_counter() - start, hits
+
+
+def run(counts=(10, 100, 1000, 10000), repeats=5):
+    rng = random.Random(1234)
+    library = make_abbreviations(max(counts), rng)
+    rng.shuffle(library)
+    # The same corpus for every size: only the index grows
+    corpus = make_corpus(rng, library[:min(counts)])
+    matchers = []
+    for n in counts:
+        m = AbbreviationMatcher()
+        start = time.perf_counter()
+        for abbr in library[:n]:
+            m.add(abbr, f"abbr:{abbr}")
+        matchers.append((m, time.perf_counter() - start))
+    # Sizes take turns so machine noise hits them all alike
+    best = [float('inf')] * len(matchers)
+    hits = [0] * len(matchers)
+    for _ in range(repeats):
+        for i, (m, _) in enumerate(matchers):
+            elapsed, hits[i] = _replay(corpus, m)
+            best[i] = min(best[i], elapsed)
+    return [{
+        'abbreviations': len(m),
+        'keystrokes': len(corpus),
+        'ns_per_keystroke': best[i] / len(corpus) * 1e9,
+        'matches': hits[i],
+        'build_ms': build * 1000,
+    } for i, (m, build) in enumerate(matchers)]
+
+
+def main():
+    results = run()
+    for r in results:
+        print(f"{r['abbreviations']:>6} abbreviations: {r['ns_per_keystroke']:7.1f} ns/keystroke "
+              f"({r['matches']} matches in {r['keystrokes']} keys, built in {r['build_ms']:.1f} ms)")
+    ratio = results[-1]['ns_per_keystroke'] / results[0]['ns_per_keystroke']
+    print(f"keystroke cost ratio {results[-1]['abbreviations']} vs {results[0]['abbreviations']} abbreviations: {ratio:.2f}x")
+    return 0 if ratio < 1.5 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
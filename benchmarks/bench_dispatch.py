@@ -0,0 +1,102 @@
+"""Per-keystroke cost of ChordDispatcher from 10 to 10,000 bindings.
+
+Runs without a real keyboard: a fake event source replays typing through
+`ChordDispatcher.feed` and scan codes come from a fixed in-memory table.
+
+    python benchmarks/bench_dispatch.py
+"""
+import os
+import sys
+import random
+import string
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chord_dispatcher import ChordDispatcher
+
+KEY_NAMES = list(string.ascii_lowercase + string.digits) + [f"f{i}" for i in range(1, 13)]
+SCAN_CODES = {name: i + 2 for i, name in enumerate(KEY_NAMES)}
+SCAN_CODES.update({'ctrl': 100, 'shift': 101, 'alt': 102})
+MOD_COMBOS = ["ctrl", "alt", "shift", "ctrl+alt", "ctrl+shift", "alt+shift", "ctrl+alt+shift"]
+
+
+def fake_resolve(name):
+    code = SCAN_CODES.get(name)
+    return (code,) if code is not None else ()
+
+
+def make_bindings(n, rng):
+    """n distinct hotkeys: every single chord, then 'mods+x, y' two-chord sequences."""
+    singles = [f"{mods}+{name}" for mods in MOD_COMBOS for name in KEY_NAMES]
+    keys = singles + [f"{first},{name}" for first in singles for name in KEY_NAMES]
+    rng.shuffle(keys)
+    return keys[:n]
+
+
+class FakeEventSource:
+    """Replays a typing stream of plain keys and modifier chords as (name, code, down) events."""
+
+    def __init__(self, rng, length=20000, chord_ratio=0.0):
+        self.events = []
+        for _ in range(length):
+            name = rng.choice(KEY_NAMES)
+            mods = rng.choice(MOD_COMBOS).split('+') if rng.random() < chord_ratio else []
+            for m in mods:
+                self.events.append((m, SCAN_CODES[m], True))
+            self.events.append((name, SCAN_CODES[name], True))
+            self.events.append((name, SCAN_CODES[name], False))
+            for m in reversed(mods):
+                self.events.append((m, SCAN_CODES[m], False))
+
+    def replay(self, dispatcher):
+        feed = dispatcher.feed
+        t = 0.0
+        for name, code, down in self.events:
+            t += 0.01
+            feed(name, code, down, t)
+        return len(self.events)
+
+
+def _best_replay(source, dispatcher, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        events = source.replay(dispatcher)
+        best = min(best, time.perf_counter() - start)
+    return best / events * 1e9
+
+
+def run(counts=(10, 100, 1000, 10000), repeats=3):
+    rng = random.Random(1234)
+    # Ordinary typing never matches a binding; the chord stream hits some of them
+    typing = FakeEventSource(rng)
+    chords = FakeEventSource(rng, chord_ratio=0.2)
+    results = []
+    for n in counts:
+        fired = []
+        d = ChordDispatcher(fired.append, resolve=fake_resolve)
+        for key in make_bindings(n, rng):
+            d.add(key)
+        results.append({
+            'bindings': len(d),
+            'typing_ns_per_event': _best_replay(typing, d, repeats),
+            'chords_ns_per_event': _best_replay(chords, d, repeats),
+            'triggers': len(fired),
+        })
+    return results
+
+
+def main():
+    results = run()
+    for r in results:
+        print(f"{r['bindings']:>6} bindings: typing {r['typing_ns_per_event']:7.1f} ns/event, "
+              f"chords {r['chords_ns_per_event']:7.1f} ns/event ({r['triggers']} triggers)")
+    ratio = results[-1]['typing_ns_per_event'] / results[0]['typing_ns_per_event']
+    print(f"typing cost ratio {results[-1]['bindings']} vs {results[0]['bindings']} bindings: {ratio:.2f}x")
+    # Flat means the largest library costs about the same per key as the smallest
+    return 0 if ratio < 1.5 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,463 @@
+"""Headless benchmark suite for QuickPaste, reported as JSON.
+
+Runs under Qt's offscreen platform with the in-memory backends from
+backends.py, so nothing is typed or pasted and no real hooks are installed.
+
+    python benchmarks/run_benchmarks.py                 # JSON to stdout
+    python benchmarks/run_benchmarks.py -o bench.json   # JSON to a file
+    python benchmarks/run_benchmarks.py --quick         # smaller sizes
+
+Compare the JSON between releases to catch regressions.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+import tempfile
+import threading
+import statistics
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt
+
+import app as appmod
+from backends import FakeInjector, FakeClipboard, FakeHookSource
+import executor as executor_mod
+from executor import SequenceExecutor
+from hotkey_service import HotkeyService
+from search_index import SearchIndex
+from sqlite_store import SqliteHotkeyStore, SqliteSearch
+import config_store
+from config_store import read_config, normalize_key
+from palette import PALETTE_RESULTS
+from templates import compile_template, Counters
+
+
+def summarize(samples):
+    """Millisecond summary of a list of second-based samples."""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        'n': len(ms),
+        'mean_ms': statistics.fmean(ms),
+        'p50_ms': ms[len(ms) // 2],
+        'p95_ms': ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+        'max_ms': ms[-1],
+    }
+
+
+def write_config(path, n):
+    data = {}
+    for i in range(n):
+        data[f"ctrl+alt+k{i}"] = {
+            'tag': f"snippet {i}",
+            'actions': [
+                {'type': 'text', 'value': f"hello world {i}", 'delay': 0.1},
+                {'type': 'key', 'value': 'enter', 'delay': 0.1},
+            ],
+        }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+class Harness:
+    """A service plus executor wired to fake backends."""
+
+    def __init__(self, config_path, engine="hooks", resolve=None):
+        self.hooks = FakeHookSource()
+        self.clipboard = FakeClipboard()
+        self.pasted = threading.Event()
+        self.injector = FakeInjector(on_send=lambda keys: self.pasted.set())
+        self.finished = threading.Event()
+        self.service = HotkeyService(engine=engine, config_file=config_path, hooks=self.hooks)
+        if resolve is not None and self.service.dispatcher is not None:
+            self.service.dispatcher.resolve = resolve
+        self.executor = SequenceExecutor(self.service.image_cache, self.injector, self.clipboard)
+        # Direct connections: the events are set on the worker thread itself
+        self.executor.sequence_finished.connect(lambda k: self.finished.set(), Qt.ConnectionType.DirectConnection)
+        self.service.paste_requested.connect(self.executor.submit)
+        self.executor.start()
+        self.service.start_listening()
+
+    def trigger(self, key):
+        """Fire `key` from a hook-like thread; returns the press timestamp."""
+        t0 = time.perf_counter()
+        thread = threading.Thread(target=self.hooks.press, args=(key,))
+        thread.start()
+        thread.join()
+        return t0
+
+    def close(self):
+        self.executor.shutdown()
+        self.service.close()
+
+
+def bench_trigger_latency(tmp, runs):
+    path = os.path.join(tmp, "latency.json")
+    write_config(path, 0)
+    h = Harness(path)
+    h.service.add_hotkey("ctrl+alt+l", [{'type': 'text', 'value': 'latency', 'delay': 0.0}])
+    samples = []
+    for _ in range(runs):
+        h.pasted.clear()
+        h.finished.clear()
+        mark = len(h.injector.sent)
+        t0 = h.trigger("ctrl+alt+l")
+        h.pasted.wait(1.0)
+        h.finished.wait(1.0)
+        samples.append(h.injector.sent[mark][0] - t0)
+    h.close()
+    return summarize(samples)
+
+
+def bench_sequence_time(tmp, runs):
+    path = os.path.join(tmp, "sequence.json")
+    write_config(path, 0)
+    h = Harness(path)
+    actions = [
+        {'type': 'text', 'value': 'a', 'delay': 0.02},
+        {'type': 'key', 'value': 'tab', 'delay': 0.02},
+        {'type': 'text', 'value': 'b', 'delay': 0.05},
+        {'type': 'key', 'value': 'enter', 'delay': 0.01},
+    ]
+    h.service.add_hotkey("ctrl+alt+s", actions)
+    configured = h.service.plans["ctrl+alt+s"].total
+    samples = []
+    for _ in range(runs):
+        h.finished.clear()
+        t0 = h.trigger("ctrl+alt+s")
+        h.finished.wait(5.0)
+        samples.append(time.perf_counter() - t0)
+    h.close()
+    result = summarize(samples)
+    result['configured_ms'] = configured * 1000
+    result['overhead_p50_ms'] = result['p50_ms'] - configured * 1000
+    return result
+
+
+def bench_large_paste(tmp, megabytes):
+    """Chunked paste of a large text side file: time, chunk count and peak Python memory.
+
+    CHUNK_GAP is set to 0 so only our own per-chunk overhead is measured.
+    """
+    path = os.path.join(tmp, "large.json")
+    write_config(path, 0)
+    h = Harness(path)
+    results = {}
+    gap, executor_mod.CHUNK_GAP = executor_mod.CHUNK_GAP, 0
+    try:
+        for mb in megabytes:
+            line = "2024-01-01 12:00:00 INFO some log line with a few words in it\n"
+            h.service.add_hotkey("ctrl+alt+b", [{'type': 'text', 'value': line * (mb * 2**20 // len(line)), 'delay': 0}])
+            h.finished.clear()
+            mark = len(h.injector.sent)
+            tracemalloc.start()
+            t0 = h.trigger("ctrl+alt+b")
+            h.finished.wait(120.0)
+            elapsed = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[f"{mb}MB"] = {
+                'total_ms': elapsed * 1000,
+                'chunks': len(h.injector.sent) - mark,
+                'peak_traced_kb': peak // 1024,
+            }
+    finally:
+        executor_mod.CHUNK_GAP = gap
+        h.close()
+    return results
+
+
+def bench_load_config(tmp, sizes):
+    results = {}
+    for n in sizes:
+        path = os.path.join(tmp, f"load_{n}.json")
+        write_config(path, n)
+        service = HotkeyService(config_file=path, hooks=FakeHookSource())
+        start = time.perf_counter()
+        service.load_config()
+        results[str(n)] = {'load_ms': (time.perf_counter() - start) * 1000, 'hotkeys': len(service.hotkeys)}
+        service.close()
+        # SQLite backend: the first open imports the JSON, the timed one only reads the index
+        db = os.path.join(tmp, f"load_{n}.db")
+        HotkeyService(config_file=path, hooks=FakeHookSource(), storage="sqlite", db_file=db).close()
+        start = time.perf_counter()
+        service = HotkeyService(config_file=path, hooks=FakeHookSource(), storage="sqlite", db_file=db)
+        results[str(n)]['sqlite_open_ms'] = (time.perf_counter() - start) * 1000
+        service.close()
+    return results
+
+
+def legacy_read_config(path):
+    """The dict-based loader read_config replaced, kept for comparison."""
+    with open(path, 'r', encoding='utf-8') as f:
+        raw_data = json.load(f)
+    hotkeys = {}
+    for k, value in raw_data.items():
+        entry = {'tag': '', 'actions': []}
+        if isinstance(value, dict) and 'actions' in value:
+            entry = value
+        elif isinstance(value, list):
+            entry['actions'] = value
+        elif isinstance(value, dict) and 'type' in value:
+            entry['actions'] = [value]
+        elif isinstance(value, str):
+            entry['actions'] = [{'type': 'text', 'value': value}]
+        hotkeys[normalize_key(k)] = entry
+    return hotkeys
+
+
+def bench_config_model(tmp, actions, repeats=3):
+    """Load time and resident size of `actions` actions as dicts versus Hotkey/Action objects."""
+    path = os.path.join(tmp, "model.json")
+    write_config(path, actions // 2)  # two actions per hotkey
+    loaders = {'dict': legacy_read_config, 'typed': read_config}
+    if config_store.orjson is not None:
+        loaders['typed_stdlib_json'] = read_config
+    results = {}
+    for name, loader in loaders.items():
+        saved = config_store.orjson
+        if name == 'typed_stdlib_json':
+            config_store.orjson = None
+        try:
+            best = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter()
+                data = loader(path)
+                best = min(best, time.perf_counter() - start)
+                del data
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            data = loader(path)
+            size = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+        finally:
+            config_store.orjson = saved
+        results[name] = {
+            'load_ms': best * 1000,
+            'resident_mb': size / 2**20,
+            'bytes_per_action': size / actions,
+        }
+        del data
+    results['orjson'] = config_store.orjson is not None
+    results['load_speedup'] = results['dict']['load_ms'] / results['typed']['load_ms']
+    results['memory_ratio'] = results['typed']['resident_mb'] / results['dict']['resident_mb']
+    return results
+
+
+def bench_refresh_table(tmp, sizes):
+    results = {}
+    for n in sizes:
+        path = os.path.join(tmp, f"table_{n}.json")
+        write_config(path, n)
+        # MainWindow does its own wiring, so hand it unconnected fakes
+        service = HotkeyService(config_file=path, hooks=FakeHookSource())
+        executor = SequenceExecutor(service.image_cache, FakeInjector(), FakeClipboard())
+        window = appmod.MainWindow(service=service, executor=executor)
+        window.show()
+        QApplication.processEvents()
+        samples = []
+        for _ in range(5):
+            start = time.perf_counter()
+            window.refresh_table()
+            QApplication.processEvents()
+            samples.append(time.perf_counter() - start)
+        results[str(n)] = summarize(samples)
+        window.tray_icon.hide()
+        window.hide()
+        window.shutdown()
+    return results
+
+
+def bench_startup(tmp, sizes):
+    """Launch to working hotkeys with the tray only vs. with the full editor shown."""
+    results = {}
+    for n in sizes:
+        path = os.path.join(tmp, f"startup_{n}.json")
+        write_config(path, n)
+        for mode in ("tray", "full"):
+            start = time.perf_counter()
+            service = HotkeyService(config_file=path, hooks=FakeHookSource())
+            executor = SequenceExecutor(service.image_cache, FakeInjector(), FakeClipboard())
+            window = appmod.MainWindow(service=service, executor=executor)
+            if mode == "full":
+                window.show()
+                QApplication.processEvents()
+            ready = time.perf_counter() - start
+            results[f"{mode}_{n}"] = {
+                'ready_ms': ready * 1000,
+                'milestones_ms': {name: t * 1000 for name, t in window.startup.marks},
+            }
+            window.tray_icon.hide()
+            window.hide()
+            window.shutdown()
+    return results
+
+
+def bench_palette(tmp, sizes):
+    """Per-keystroke palette search: every prefix of a few queries, typos included.
+
+    Measured on the in-memory trigram index and on the SQLite document table.
+    """
+    queries = ["hello world 4242", "snippet 99", "helo wrld", "zzz"]
+    results = {}
+    for n in sizes:
+        path = os.path.join(tmp, f"palette_{n}.json")
+        write_config(path, n)
+        index = SearchIndex()
+        index.rebuild(read_config(path).items())
+        store = SqliteHotkeyStore(os.path.join(tmp, f"palette_{n}.db"))
+        store.import_json(path)
+        # As if a few hundred hotkeys had been used recently
+        preferred = [f"ctrl+alt+k{i}" for i in range(0, n, max(1, n // 300))]
+        for name, search in (("memory", index), ("sqlite", SqliteSearch(store))):
+            samples = []
+            for q in queries:
+                for end in range(1, len(q) + 1):
+                    start = time.perf_counter()
+                    search.top(q[:end], PALETTE_RESULTS, preferred)
+                    samples.append(time.perf_counter() - start)
+            results[str(n) if name == "memory" else f"sqlite_{n}"] = summarize(samples)
+        store.close()
+    return results
+
+
+def bench_templates(tmp, runs):
+    """Render cost of a text action with placeholders versus the same text compiled static."""
+    clipboard = FakeClipboard()
+    clipboard.set_text("clipboard contents " * 10)
+    counters = Counters(os.path.join(tmp, "counters.json"))
+    cases = {
+        'static': "Best regards,\nThe QuickPaste team " * 20,
+        'date_counter': "Invoice #{counter:invoice} issued {date:%Y-%m-%d %H:%M} " * 5,
+        'clipboard': "Quoted: {clipboard}\n-- sent {date}",
+    }
+    results = {}
+    for name, text in cases.items():
+        value, _ = compile_template(text)
+        samples = []
+        for _ in range(runs * 10):
+            start = time.perf_counter()
+            if value.__class__ is not str:
+                value.render(clipboard, counters)
+            samples.append(time.perf_counter() - start)
+        results[name] = summarize(samples)
+        start = time.perf_counter()
+        for _ in range(runs):
+            compile_template(text)
+        results[name]['compile_us'] = (time.perf_counter() - start) / runs * 1e6
+    counters.close()
+    return results
+
+
+def bench_config_reload(tmp, sizes):
+    """Apply an externally edited config where 1% of the entries changed."""
+    results = {}
+    for n in sizes:
+        path = os.path.join(tmp, f"reload_{n}.json")
+        write_config(path, n)
+        h = Harness(path)
+        before = dict(h.hooks.hotkeys)
+        data = read_config(path)
+        for i in range(0, n, 100):
+            data[f"ctrl+alt+k{i}"] = {'tag': f"changed {i}", 'actions': [{'type': 'text', 'value': f"new {i}"}]}
+        start = time.perf_counter()
+        changed = h.service.apply_config(data)
+        elapsed = time.perf_counter() - start
+        kept = sum(1 for handle in before if handle in h.hooks.hotkeys)
+        results[str(n)] = {
+            'apply_ms': elapsed * 1000,
+            'changed': len(changed),
+            'hooks_untouched': kept,
+        }
+        h.close()
+    return results
+
+
+def bench_registration(tmp, sizes):
+    results = {}
+    for engine in ("hooks", "single"):
+        for n in sizes:
+            path = os.path.join(tmp, f"reg_{engine}_{n}.json")
+            write_config(path, n)
+            # No OS key tables headless; give every key name a stable fake scan code
+            codes = {}
+            h = Harness(path, engine=engine, resolve=lambda name: (codes.setdefault(name, len(codes) + 1),))
+            h.service.stop_listening()
+            start = time.perf_counter()
+            h.service.start_listening()
+            full = time.perf_counter() - start
+            start = time.perf_counter()
+            h.service.add_hotkey("ctrl+alt+new", [{'type': 'text', 'value': 'x'}])
+            single = time.perf_counter() - start
+            stats = h.service.registration_stats()
+            results[f"{engine}_{n}"] = {
+                'full_register_ms': full * 1000,
+                'add_one_ms': single * 1000,
+                'registered': stats['registered'],
+            }
+            h.close()
+    return results
+
+
+def run(quick=False):
+    sizes = (1000, 10000) if quick else (10000, 100000)
+    runs = 50 if quick else 200
+    app = QApplication.instance() or QApplication(sys.argv)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settle times and other side files land in the temp dir
+        os.chdir(tmp)
+        try:
+            # The app's own log lines must not end up in the JSON on stdout
+            with contextlib.redirect_stdout(sys.stderr):
+                results = {
+                    'trigger_to_first_paste': bench_trigger_latency(tmp, runs),
+                    'sequence_time': bench_sequence_time(tmp, max(5, runs // 10)),
+                    'large_paste': bench_large_paste(tmp, (1,) if quick else (1, 16)),
+                    'load_config': bench_load_config(tmp, sizes),
+                    'config_model': bench_config_model(tmp, 10000 if quick else 100000),
+                    'refresh_table': bench_refresh_table(tmp, sizes),
+                    'startup': bench_startup(tmp, sizes),
+                    'palette_search': bench_palette(tmp, sizes),
+                    'template_render': bench_templates(tmp, runs),
+                    'config_reload': bench_config_reload(tmp, sizes),
+                    'registration': bench_registration(tmp, sizes),
+                }
+        finally:
+            os.chdir(cwd)
+    return {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'qt_platform': os.environ.get("QT_QPA_PLATFORM"),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast check")
+    args = parser.parse_args()
+    report = run(quick=args.quick)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import time
+
+import keyboard
+
+# Event/hotkey names (spaces removed, as normalize_key does) -> canonical modifier
+MODIFIER_NAMES = {
+    'ctrl': 'ctrl', 'leftctrl': 'ctrl', 'rightctrl': 'ctrl', 'control': 'ctrl',
+    'shift': 'shift', 'leftshift': 'shift', 'rightshift': 'shift',
+    'alt': 'alt', 'leftalt': 'alt', 'rightalt': 'alt', 'altgr': 'alt',
+    'windows': 'windows', 'leftwindows': 'windows', 'rightwindows': 'windows',
+    'win': 'windows', 'command': 'windows',
+}
+
+# Seconds allowed between the chords of a multi-chord hotkey such as "ctrl+k, 1"
+SEQUENCE_TIMEOUT = 1.0
+
+
+def parse_hotkey(key):
+    """Split a normalized hotkey into steps of (modifiers, main key name).
+
+    "ctrl+k,1" -> [(frozenset({'ctrl'}), 'k'), (frozenset(), '1')]
+    """
+    steps = []
+    for step in key.split(','):
+        mods = set()
+        main = None
+        for part in step.split('+'):
+            if not part:
+                continue
+            if part in MODIFIER_NAMES:
+                mods.add(MODIFIER_NAMES[part])
+            elif main is None:
+                main = part
+            else:
+                raise ValueError(f"more than one main key in '{step}'")
+        if main is None:
+            raise ValueError(f"no main key in '{step}'")
+        steps.append((frozenset(mods), main))
+    if not steps:
+        raise ValueError("empty hotkey")
+    return steps
+
+
+def _resolve_scan_codes(name):
+    return keyboard.key_to_scan_codes(name)
+
+
+class _Node:
+    __slots__ = ('key', 'children')
+
+    def __init__(self):
+        self.key = None
+        self.children = {}
+
+
+class ChordDispatcher:
+    """One low-level hook that dispatches every binding through a chord index.
+
+    Bindings are stored in a trie keyed on (modifier set, scan code), so each
+    key press is a single dict lookup no matter how many hotkeys exist. Unlike
+    `keyboard.add_hotkey`, a half-typed multi-chord sequence that times out is
+    swallowed rather than replayed.
+
+    `on_trigger(key)` runs inside the hook; a truthy return value lets the
+    keys through instead of suppressing them. While `is_paused()` is true
+    every key passes untouched, including the prefix of a multi-chord hotkey.
+    """
+
+    def __init__(self, on_trigger, is_paused=lambda: False, resolve=_resolve_scan_codes,
+                 timeout=SEQUENCE_TIMEOUT, hooks=keyboard):
+        self.on_trigger = on_trigger
+        self.hooks = hooks
+        self.is_paused = is_paused
+        self.resolve = resolve
+        self.timeout = timeout
+        self._root = _Node()
+        self._paths = {}  # hotkey -> list of trie paths registered for it
+        self._mods = set()
+        self._node = self._root
+        self._last = 0.0
+        self._swallowed = set()  # scan codes whose key-down we suppressed
+        self._hook = None
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, key):
+        return key in self._paths
+
+    def _expand(self, steps):
+        """Every scan-code path a hotkey can be typed with (e.g. both '1' keys)."""
+        paths = [()]
+        for mods, main in steps:
+            codes = self.resolve(main)
+            if not codes:
+                raise ValueError(f"unknown key '{main}'")
+            paths = [p + ((mods, code),) for p in paths for code in codes]
+        return paths
+
+    def add(self, key):
+        paths = self._expand(parse_hotkey(key))
+        if key in self._paths:
+            self.remove(key)
+        for path in paths:
+            node = self._root
+            for chord in path:
+                node = node.children.setdefault(chord, _Node())
+            node.key = key
+        self._paths[key] = paths
+
+    def remove(self, key):
+        for path in self._paths.pop(key, ()):
+            trail = [self._root]
+            for chord in path:
+                nxt = trail[-1].children.get(chord)
+                if nxt is None:
+                    break
+                trail.append(nxt)
+            else:
+                if trail[-1].key == key:
+                    trail[-1].key = None
+                # Prune nodes that no longer lead anywhere
+                for parent, chord, node in zip(reversed(trail[:-1]), reversed(path), reversed(trail[1:])):
+                    if node.key is None and not node.children:
+                        del parent.children[chord]
+                    else:
+                        break
+        self._node = self._root
+
+    def clear(self):
+        self._root = _Node()
+        self._paths = {}
+        self._node = self._root
+
+    def feed(self, name, scan_code, is_down, t=None):
+        """Process one key event; returns False when it should be suppressed."""
+        name = (name or '').lower().replace(' ', '')
+        mod = MODIFIER_NAMES.get(name)
+        if mod is not None:
+            if is_down:
+                self._mods.add(mod)
+            else:
+                self._mods.discard(mod)
+            return True
+
+        if not is_down:
+            if scan_code in self._swallowed:
+                self._swallowed.discard(scan_code)
+                return False
+            return True
+
+        if self.is_paused():
+            self._node = self._root
+            return True
+        if t is None:
+            t = time.monotonic()
+        chord = (frozenset(self._mods), scan_code)
+        node = self._node
+        if node is not self._root and t - self._last > self.timeout:
+            node = self._root
+        child = node.children.get(chord)
+        if child is None and node is not self._root:
+            child = self._root.children.get(chord)
+        if child is None:
+            self._node = self._root
+            return True
+
+        self._last = t
+        self._node = child if child.children else self._root
+        if child.key is not None and self.on_trigger(child.key):
+            return True
+        self._swallowed.add(scan_code)
+        return False
+
+    def _on_event(self, event):
+        return self.feed(event.name, event.scan_code, event.event_type == keyboard.KEY_DOWN, event.time)
+
+    def install(self):
+        if self._hook is None:
+            self._hook = self.hooks.hook(self._on_event, suppress=True)
+
+    def uninstall(self):
+        if self._hook is not None:
+            try:
+                self.hooks.unhook(self._hook)
+            except Exception:
+                pass
+            self._hook = None
+        self._mods.clear()
+        self._swallowed.clear()
+        self._node = self._root
@@ -0,0 +1,90 @@
+import os
+import json
+import time
+
+SETTLE_FILE = "settle.json"
+
+# Polling bounds while waiting for the clipboard to report what we just wrote
+POLL_INTERVAL = 0.002
+MAX_POLL_INTERVAL = 0.02
+MIN_DEADLINE = 0.25
+MAX_DEADLINE = 2.0
+# After this many timeouts in a row an action's readback is taken as unreliable
+# (clipboard managers, normalised line endings) and it gets the old fixed wait
+MAX_MISSES = 2
+FALLBACK_WAIT = 0.05
+# Weight of the newest sample in the learned settle time
+LEARN_RATE = 0.3
+
+
+class SettleTracker:
+    """Learns how long the clipboard takes to hold each action's content.
+
+    Times are kept per action id (hotkey plus step index) as a moving average
+    and written to SETTLE_FILE so the next run starts from what was learned.
+    Only confirmed waits are learned: a timeout says nothing about how long
+    the clipboard took, and learning it would push the deadline up for good.
+    """
+
+    def __init__(self, path=SETTLE_FILE):
+        self.path = path
+        self.times = {}
+        self.misses = {}  # action id -> timeouts in a row, this session only
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.times = {k: float(v) for k, v in json.load(f).items()}
+            except Exception as e:
+                print(f"Error loading settle times: {e}")
+
+    def record(self, action_id, seconds):
+        old = self.times.get(action_id)
+        self.times[action_id] = seconds if old is None else old + LEARN_RATE * (seconds - old)
+        self.dirty = True
+
+    def poll_interval(self, action_id):
+        expected = self.times.get(action_id, 0.0)
+        return min(MAX_POLL_INTERVAL, max(POLL_INTERVAL, expected / 4))
+
+    def deadline(self, action_id):
+        if self.misses.get(action_id, 0) >= MAX_MISSES:
+            return FALLBACK_WAIT
+        expected = self.times.get(action_id)
+        if expected is None:
+            return MIN_DEADLINE
+        return min(MAX_DEADLINE, max(MIN_DEADLINE, expected * 4))
+
+    def wait_until(self, action_id, is_ready):
+        """Generator yielding poll delays until `is_ready()` or the deadline.
+
+        Returns True when the clipboard confirmed the content; on timeout the
+        caller pastes anyway, which matches the old fixed-sleep behaviour.
+        """
+        start = time.perf_counter()
+        deadline = self.deadline(action_id)
+        interval = self.poll_interval(action_id)
+        while True:
+            try:
+                ready = is_ready()
+            except Exception:
+                ready = False
+            elapsed = time.perf_counter() - start
+            if ready:
+                self.misses.pop(action_id, None)
+                self.record(action_id, elapsed)
+                return True
+            if elapsed >= deadline:
+                self.misses[action_id] = self.misses.get(action_id, 0) + 1
+                return False
+            yield interval
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.times, f, indent=4)
+            self.dirty = False
+        except Exception as e:
+            print(f"Error saving settle times: {e}")
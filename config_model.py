@@ -0,0 +1,196 @@
+import sys
+
+_intern = sys.intern
+
+ACTION_FIELDS = ('type', 'value', 'delay', 'file', 'chars')
+HOTKEY_FIELDS = ('tag', 'actions', 'policy', 'abbr')
+_ACTION_KEYS = frozenset(ACTION_FIELDS)
+_HOTKEY_KEYS = frozenset(HOTKEY_FIELDS)
+_TEXT = (str, type(None))
+
+
+class _Record:
+    """Shared behaviour of Action and Hotkey.
+
+    Fields mirror the JSON keys and are None where the JSON has no such key;
+    keys we do not know are kept in `extra` as (name, value) pairs, so saving
+    writes back everything that was read. Instances are shared with the
+    config writer thread and the plan cache and are never modified: use
+    `replace`. They also read like the dicts they replace (`get`, `[]`,
+    `in`, `keys`, `items`), so callers written against plain entries keep working.
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def get(self, name, default=None):
+        if name in self._fields:
+            value = getattr(self, name)
+        else:
+            value = next((v for k, v in self.extra if k == name), None)
+        return default if value is None else value
+
+    def __getitem__(self, name):
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def keys(self):
+        return self.to_json().keys()
+
+    def items(self):
+        return self.to_json().items()
+
+    def replace(self, **changes):
+        """A copy with some fields changed; None removes a field."""
+        data = self.to_json()
+        data.update(changes)
+        return self.from_json(data)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, f) for f in self.__slots__))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.to_json()!r})"
+
+
+class Action(_Record):
+    """One step of a sequence: {'type', 'value', 'delay'} plus 'file'/'chars' for large text."""
+    __slots__ = ACTION_FIELDS + ('extra',)
+    _fields = ACTION_FIELDS
+
+    def __init__(self, type=None, value=None, delay=None, file=None, chars=None, extra=()):
+        # A config has thousands of actions but only three type names and a few dozen key names
+        if type.__class__ is str:
+            type = _intern(type)
+            if type == 'key' and value.__class__ is str:
+                value = _intern(value)
+        self.type = type
+        self.value = value
+        self.delay = delay
+        self.file = file
+        self.chars = chars
+        self.extra = extra
+
+    @classmethod
+    def from_json(cls, data):
+        get = data.get
+        if data.keys() <= _ACTION_KEYS:
+            return cls(get('type'), get('value'), get('delay'), get('file'), get('chars'))
+        extra = tuple((k, v) for k, v in data.items() if k not in _ACTION_KEYS)
+        return cls(get('type'), get('value'), get('delay'), get('file'), get('chars'), extra)
+
+    def to_json(self):
+        data = {}
+        for name in ACTION_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        data.update(self.extra)
+        return data
+
+
+def _actions(items, new=Action, keys=_ACTION_KEYS):
+    """Tuple of Actions from a JSON action list; non-objects are kept for compile_actions to report."""
+    # The common case (a plain dict of known keys) is built inline: this runs once per action on load
+    return tuple([new(a.get('type'), a.get('value'), a.get('delay'), a.get('file'), a.get('chars'))
+                  if a.__class__ is dict and a.keys() <= keys else
+                  Action.from_json(a) if isinstance(a, dict) else a
+                  for a in items])
+
+
+class Hotkey(_Record):
+    """A config entry: note, actions, repeat policy and optional abbreviation."""
+    __slots__ = HOTKEY_FIELDS + ('extra',)
+    _fields = HOTKEY_FIELDS
+
+    def __init__(self, tag=None, actions=(), policy=None, abbr=None, extra=()):
+        self.tag = tag
+        # A list (of dicts or Actions) is converted; a tuple is taken to hold Actions already
+        self.actions = (_actions(actions) if actions.__class__ is list else
+                        actions if actions.__class__ is tuple else ())
+        self.policy = _intern(policy) if policy.__class__ is str else policy
+        self.abbr = abbr
+        self.extra = extra
+
+    @classmethod
+    def from_json(cls, data, problems=None, key=""):
+        """Build from any config shape since v1 (v4 dict, action list, single action, plain text).
+
+        Type problems are appended to `problems` as messages. Wrong tag,
+        policy or abbr values are kept as they are, so nothing is lost on the
+        next save; an `actions` value that is not a list is cleared, since
+        every consumer iterates it.
+        """
+        if isinstance(data, dict) and 'actions' in data:
+            get = data.get
+            actions = get('actions')
+            if actions.__class__ is not list:
+                if problems is not None:
+                    problems.append(f"Hotkey '{key}': actions should be a list, not {actions!r:.40}; cleared")
+                actions = []
+            extra = () if data.keys() <= _HOTKEY_KEYS else tuple(
+                (k, v) for k, v in data.items() if k not in _HOTKEY_KEYS)
+            entry = cls(get('tag'), actions, get('policy'), get('abbr'), extra)
+            # Fields are nearly always fine; only look closer when one is not
+            if problems is not None and not (
+                    entry.tag.__class__ in _TEXT and entry.policy.__class__ in _TEXT
+                    and entry.abbr.__class__ in _TEXT):
+                entry._check(problems, key)
+            return entry
+        if isinstance(data, list):
+            return cls('', data)
+        if isinstance(data, dict) and 'type' in data:
+            return cls('', [data])
+        if isinstance(data, str):
+            return cls('', (Action('text', data),))
+        if problems is not None:
+            problems.append(f"Hotkey '{key}': unreadable entry {data!r:.40}, dropped")
+        return cls('', [])
+
+    def _check(self, problems, key):
+        for name in ('tag', 'policy', 'abbr'):
+            value = getattr(self, name)
+            if value is not None and value.__class__ is not str:
+                problems.append(f"Hotkey '{key}': {name} should be text, not {value!r:.40}")
+
+    def file_refs(self):
+        """('image' | 'text', path as written) for every side file the actions use."""
+        for act in self.actions:
+            if act.__class__ is not Action:
+                continue
+            if act.type == 'image' and act.value.__class__ is str:
+                yield 'image', act.value
+            elif act.type == 'text' and act.file.__class__ is str:
+                yield 'text', act.file
+
+    def to_json(self):
+        data = {}
+        for name in HOTKEY_FIELDS:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if name == 'actions' and value.__class__ is tuple:
+                value = [a.to_json() if a.__class__ is Action else a for a in value]
+            data[name] = value
+        data.update(self.extra)
+        return data
+
+
+def as_hotkey(entry):
+    return entry if entry.__class__ is Hotkey else Hotkey.from_json(entry)
+
+
+def to_json(obj):
+    """`default=` hook for json.dump over {key: Hotkey} mappings."""
+    if isinstance(obj, _Record):
+        return obj.to_json()
+    raise TypeError(f"{obj.__class__.__name__} is not JSON serializable")
@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import time
+import codecs
+import threading
+
+try:
+    import orjson
+except ImportError:  # optional; parses large configs several times faster than json
+    orjson = None
+
+from config_model import Hotkey, to_json
+
+# Quiet period after the last change before config.json is rewritten
+SAVE_DEBOUNCE = 0.5
+
+
+def normalize_key(key_combo):
+    if not key_combo:
+        return ""
+    return key_combo.lower().replace(" ", "")
+
+
+def load_json(path):
+    """Parse a JSON file with orjson when it is installed, else the json module."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def read_config(path, problems=None):
+    """Parse a config file into {normalized key: Hotkey} in one pass; raises on unreadable JSON.
+
+    Entries in older shapes are migrated on the way; type problems are
+    appended to `problems` when a list is given.
+    """
+    raw_data = load_json(path)
+    if not isinstance(raw_data, dict):
+        raise ValueError("config must be a JSON object")
+    intern = sys.intern
+    from_json = Hotkey.from_json
+    hotkeys = {}
+    for k, v in raw_data.items():
+        key = intern(normalize_key(k))
+        hotkeys[key] = from_json(v, problems, key)
+    return hotkeys
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ConfigWriter:
+    """Write-behind persistence for the hotkey config.
+
+    `schedule` only records a snapshot and returns; a background thread writes
+    it once changes stop arriving for `debounce` seconds, so a burst of edits
+    costs one serialization. Files are written to a temp file and renamed over
+    the target, so a crash mid-write never leaves a truncated config.
+    """
+
+    def __init__(self, path, debounce=SAVE_DEBOUNCE):
+        self.path = path
+        self.debounce = debounce
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = None
+        self._seq = 0
+        self._written_seq = 0
+        self._due = 0.0
+        self._closed = False
+        # file_signature() right after our last write, so a watcher can skip it
+        self.last_written = None
+        self._thread = threading.Thread(target=self._run, name="ConfigWriter", daemon=True)
+        self._thread.start()
+
+    def schedule(self, hotkeys):
+        # Shallow copy: entries are replaced, not mutated structurally, so the
+        # writer thread can serialize them while the GUI keeps editing
+        snapshot = dict(hotkeys)
+        with self._cond:
+            self._seq += 1
+            self._pending = (self._seq, snapshot)
+            self._due = time.monotonic() + self.debounce
+            self._cond.notify()
+
+    @property
+    def pending(self):
+        """True while a snapshot is waiting to be written or being written."""
+        with self._cond:
+            return self._pending is not None or self._write_lock.locked()
+
+    def flush(self):
+        """Write any pending snapshot now, on the calling thread."""
+        with self._cond:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            self._write(*pending)
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and (self._pending is None or time.monotonic() < self._due):
+                    timeout = None if self._pending is None else self._due - time.monotonic()
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+                pending, self._pending = self._pending, None
+            self._write(*pending)
+
+    def _write(self, seq, data):
+        tmp = self.path + ".tmp"
+        with self._write_lock:
+            # A flush may have already written a newer snapshot
+            if seq <= self._written_seq:
+                return
+            self._written_seq = seq
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=4, default=to_json)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self.last_written = file_signature(self.path)
+            except Exception as e:
+                print(f"Error saving config: {e}")
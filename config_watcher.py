@@ -0,0 +1,85 @@
+import os
+import threading
+
+from PyQt6.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal, pyqtSlot
+
+from config_store import read_config, file_signature
+
+# Quiet period after the last file event before the config is re-read
+WATCH_DEBOUNCE_MS = 300
+
+
+class ConfigWatcher(QObject):
+    """Re-reads the config file when something else changes it.
+
+    File events are debounced, then the file is parsed on a background
+    thread and `loaded(hotkeys)` is emitted on the watcher's thread. Writes
+    made by our own ConfigWriter are recognised by their file signature and
+    ignored. The directory is watched too, because an atomic replace (ours
+    or a deployment tool's) swaps the file out from under a file watch.
+    """
+    loaded = pyqtSignal(object)
+    _parsed = pyqtSignal(int, object)
+
+    def __init__(self, path, writer=None, debounce_ms=WATCH_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.path = os.path.abspath(path)
+        self.writer = writer
+        self._seen = file_signature(self.path)
+        self._generation = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self.check)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_event)
+        self._watcher.directoryChanged.connect(self._on_event)
+        self._parsed.connect(self._on_parsed)
+        self._watch()
+
+    def _watch(self):
+        watched = set(self._watcher.files()) | set(self._watcher.directories())
+        for p in (self.path, os.path.dirname(self.path)):
+            if p not in watched and os.path.exists(p):
+                self._watcher.addPath(p)
+
+    def _on_event(self, path):
+        self._timer.start()
+
+    def mark_seen(self):
+        """Treat the file as it is now as already loaded."""
+        self._seen = file_signature(self.path)
+
+    @pyqtSlot()
+    def check(self):
+        self._watch()
+        sig = file_signature(self.path)
+        if sig is None or sig == self._seen:
+            return
+        self._seen = sig
+        if self.writer is not None and sig == self.writer.last_written:
+            return
+        self._generation += 1
+        threading.Thread(target=self._parse, args=(self._generation,), daemon=True).start()
+
+    def _parse(self, generation):
+        try:
+            hotkeys = read_config(self.path)
+        except Exception as e:
+            # Usually caught mid-write by a tool that does not replace atomically; the next event retries
+            print(f"Error reloading config: {e}")
+            self._seen = None
+            return
+        self._parsed.emit(generation, hotkeys)
+
+    @pyqtSlot(int, object)
+    def _on_parsed(self, generation, hotkeys):
+        # An older parse finishing late must not undo a newer one
+        if generation == self._generation:
+            self.loaded.emit(hotkeys)
+
+    def stop(self):
+        self._timer.stop()
+        self._generation += 1
+        for p in self._watcher.files() + self._watcher.directories():
+            self._watcher.removePath(p)
@@ -0,0 +1,412 @@
+"""Headless QuickPaste: hotkeys, abbreviations and playback without any window.
+
+Runs `HotkeyService` and `SequenceExecutor` under a QGuiApplication (the
+clipboard needs one, widgets are never loaded) and serves a local socket
+API, one JSON object per line in each direction:
+
+    {"id": 1, "cmd": "list"}
+    {"id": 2, "cmd": "trigger", "key": "ctrl+alt+1"}      # or "tag": "地址"
+    {"id": 3, "cmd": "run", "actions": [{"type": "text", "value": "hi"}]}
+    {"id": 4, "cmd": "subscribe"}                           # then event lines
+    {"cmd": "cancel"} / {"cmd": "pause"} / {"cmd": "resume"} / {"cmd": "ping"}
+    {"cmd": "pause", "reason": "user"}                     # the Ctrl+Alt+P pause
+
+Replies echo "id" and carry "ok"; failures add "error". After "subscribe"
+the connection also receives {"event": ...} lines for started, finished,
+cancelled, dropped, progress (chunked large text), paused, hotkeys_changed
+and palette.
+
+    python daemon.py                      # serve
+    python daemon.py --call '{"cmd": "list"}'
+    python daemon.py --watch              # print events until Ctrl+C
+"""
+import os
+import sys
+import json
+import time
+import signal
+import getpass
+import argparse
+
+from PyQt6.QtCore import QObject, QCoreApplication, QTimer, pyqtSignal, pyqtSlot
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+# On Linux and macOS the name becomes a Unix socket in the temp directory, on Windows a named pipe
+DAEMON_SOCKET = f"quickpaste-{getpass.getuser()}"
+# How long a blocking client call waits for the daemon
+CLIENT_TIMEOUT_MS = 2000
+# Lines longer than this are refused instead of buffered without bound
+MAX_REQUEST_BYTES = 4 << 20
+
+
+def _encode(obj):
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8') + b"\n"
+
+
+class DaemonServer(QObject):
+    """JSON-lines API over a QLocalServer for a running service and executor."""
+
+    def __init__(self, service, executor, name=DAEMON_SOCKET, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.executor = executor
+        self.name = name
+        self.server = QLocalServer(self)
+        # Only the current user may connect
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self._on_connection)
+        self._buffers = {}  # socket -> bytes received without a newline yet
+        self._subscribers = set()
+        self.commands = {
+            'ping': self.cmd_ping,
+            'list': self.cmd_list,
+            'trigger': self.cmd_trigger,
+            'run': self.cmd_run,
+            'cancel': self.cmd_cancel,
+            'pause': self.cmd_pause,
+            'resume': self.cmd_resume,
+        }
+        executor.sequence_started.connect(self.on_sequence_started)
+        executor.sequence_finished.connect(self.on_sequence_finished)
+        executor.sequence_cancelled.connect(self.on_sequence_cancelled)
+        executor.trigger_dropped.connect(self.on_trigger_dropped)
+        executor.sequence_progress.connect(self.on_sequence_progress)
+        service.pause_changed.connect(self.on_pause_changed)
+        service.hotkeys_changed.connect(self.on_hotkeys_changed)
+        service.palette_requested.connect(self.on_palette_requested)
+
+    def listen(self):
+        probe = QLocalSocket()
+        probe.connectToServer(self.name)
+        if probe.waitForConnected(200):
+            probe.disconnectFromServer()
+            raise RuntimeError(f"another daemon is already serving '{self.name}'")
+        # A socket file left behind by a crashed daemon would make listen() fail
+        QLocalServer.removeServer(self.name)
+        if not self.server.listen(self.name):
+            raise RuntimeError(f"cannot listen on '{self.name}': {self.server.errorString()}")
+        return self.server.fullServerName()
+
+    def close(self):
+        for sock in list(self._buffers):
+            sock.disconnectFromServer()
+        self.server.close()
+
+    def _on_connection(self):
+        while self.server.hasPendingConnections():
+            sock = self.server.nextPendingConnection()
+            self._buffers[sock] = b""
+            sock.readyRead.connect(lambda s=sock: self._on_ready_read(s))
+            sock.disconnected.connect(lambda s=sock: self._on_disconnected(s))
+
+    def _on_disconnected(self, sock):
+        self._buffers.pop(sock, None)
+        self._subscribers.discard(sock)
+        sock.deleteLater()
+
+    def _on_ready_read(self, sock):
+        if sock not in self._buffers:
+            return
+        data = self._buffers[sock] + bytes(sock.readAll())
+        *lines, rest = data.split(b"\n")
+        if len(rest) > MAX_REQUEST_BYTES:
+            sock.write(_encode({'ok': False, 'error': "request too large"}))
+            sock.disconnectFromServer()
+            return
+        self._buffers[sock] = rest
+        for line in lines:
+            if line.strip():
+                sock.write(_encode(self.handle(line, sock)))
+
+    def handle(self, line, sock=None):
+        """Reply dict for one request line."""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {'ok': False, 'error': f"invalid JSON: {e}"}
+        if not isinstance(request, dict):
+            return {'ok': False, 'error': "request must be a JSON object"}
+        reply = {'id': request['id']} if 'id' in request else {}
+        cmd = request.get('cmd')
+        if cmd == 'subscribe' and sock is not None:
+            self._subscribers.add(sock)
+            reply.update(ok=True)
+            return reply
+        handler = self.commands.get(cmd)
+        if handler is None:
+            reply.update(ok=False, error=f"unknown command {cmd!r}")
+            return reply
+        try:
+            reply.update(handler(request))
+        except (KeyError, TypeError, ValueError) as e:
+            reply.update(ok=False, error=str(e))
+        return reply
+
+    # --- commands -------------------------------------------------------
+
+    def cmd_ping(self, request):
+        return {'ok': True, 'paused': self.service.is_paused(), 'user': self.service.is_paused('user'),
+                'busy': self.executor.is_busy()}
+
+    def cmd_list(self, request):
+        service = self.service
+        hotkeys = []
+        for key, data in service.hotkeys.items():
+            hotkeys.append({
+                'key': key,
+                'tag': data.get('tag', ''),
+                'abbr': data.get('abbr', ''),
+                'policy': data.get('policy'),
+                'actions': service.action_count(key),
+            })
+        return {'ok': True, 'hotkeys': hotkeys}
+
+    def cmd_trigger(self, request):
+        key = request.get('key')
+        if key is None and request.get('tag') is not None:
+            key = self.service.find_tag(str(request['tag']))
+            if key is None:
+                return {'ok': False, 'error': f"no hotkey tagged {request['tag']!r}"}
+        if not isinstance(key, str):
+            return {'ok': False, 'error': "'key' or 'tag' required"}
+        key = self.service.normalize_key(key)
+        if not self.service.run_hotkey(key):
+            return {'ok': False, 'error': f"no hotkey {key!r}"}
+        return {'ok': True, 'key': key}
+
+    def cmd_run(self, request):
+        actions = request.get('actions')
+        if not isinstance(actions, list) or not actions:
+            return {'ok': False, 'error': "'actions' must be a non-empty list"}
+        policy = request.get('policy', 'queue')
+        plan = self.service.run_actions(actions, policy)
+        if plan.errors:
+            return {'ok': False, 'error': "; ".join(plan.errors)}
+        return {'ok': True, 'steps': len(plan.steps)}
+
+    def cmd_cancel(self, request):
+        self.service.cancel_requested.emit()
+        return {'ok': True}
+
+    @staticmethod
+    def _pause_reason(request):
+        # 'api' for scripts, 'editor' while a client's editor has focus, 'user' for Ctrl+Alt+P
+        # and the tray toggle; each is lifted only by a resume with the same reason
+        reason = request.get('reason', 'api')
+        if reason not in ('api', 'editor', 'user'):
+            raise ValueError(f"unknown pause reason {reason!r}")
+        return reason
+
+    def cmd_pause(self, request):
+        self.service.pause(self._pause_reason(request))
+        return {'ok': True}
+
+    def cmd_resume(self, request):
+        self.service.resume(self._pause_reason(request))
+        return {'ok': True}
+
+    # --- events ---------------------------------------------------------
+
+    def publish(self, event, **fields):
+        if not self._subscribers:
+            return
+        line = _encode(dict(event=event, time=time.time(), **fields))
+        for sock in list(self._subscribers):
+            sock.write(line)
+
+    # Executor signals arrive from the worker thread; slots keep them queued here
+    @pyqtSlot(str)
+    def on_sequence_started(self, key):
+        self.publish('started', key=key)
+
+    @pyqtSlot(str)
+    def on_sequence_finished(self, key):
+        self.publish('finished', key=key)
+
+    @pyqtSlot(str)
+    def on_sequence_cancelled(self, key):
+        self.publish('cancelled', key=key)
+
+    @pyqtSlot(str)
+    def on_trigger_dropped(self, key):
+        self.publish('dropped', key=key)
+
+    @pyqtSlot(str, int, int)
+    def on_sequence_progress(self, key, done, total):
+        self.publish('progress', key=key, done=done, total=total)
+
+    @pyqtSlot(bool)
+    def on_pause_changed(self, paused):
+        self.publish('paused', paused=paused, user=self.service.is_paused('user'))
+
+    @pyqtSlot(list)
+    def on_hotkeys_changed(self, keys):
+        self.publish('hotkeys_changed', keys=keys)
+
+    @pyqtSlot()
+    def on_palette_requested(self):
+        # The daemon has no window; a subscribed GUI client opens the palette
+        self.publish('palette')
+
+
+class DaemonClient(QObject):
+    """Talks to a running daemon.
+
+    `request` blocks (up to `timeout_ms`) on its own connection. `subscribe`
+    opens a second connection whose events arrive as `event_received` from
+    the Qt event loop.
+    """
+    event_received = pyqtSignal(dict)
+
+    def __init__(self, name=DAEMON_SOCKET, timeout_ms=CLIENT_TIMEOUT_MS, parent=None):
+        super().__init__(parent)
+        self.name = name
+        self.timeout_ms = timeout_ms
+        self._sock = None
+        self._events = None
+        self._event_buffer = b""
+        self._next_id = 0
+
+    def _connect(self):
+        sock = QLocalSocket(self)
+        sock.connectToServer(self.name)
+        if not sock.waitForConnected(self.timeout_ms):
+            err = sock.errorString()
+            sock.deleteLater()
+            raise ConnectionError(f"QuickPaste daemon not reachable at '{self.name}': {err}")
+        return sock
+
+    def is_running(self):
+        try:
+            return bool(self.request('ping').get('ok'))
+        except ConnectionError:
+            return False
+
+    def request(self, cmd, **fields):
+        """Send one command and wait for its reply dict."""
+        if self._sock is None or self._sock.state() != QLocalSocket.LocalSocketState.ConnectedState:
+            self._sock = self._connect()
+        self._next_id += 1
+        req_id = self._next_id
+        self._sock.write(_encode(dict(fields, id=req_id, cmd=cmd)))
+        self._sock.flush()
+        buf = b""
+        deadline = time.monotonic() + self.timeout_ms / 1000
+        while True:
+            while b"\n" not in buf:
+                left = int((deadline - time.monotonic()) * 1000)
+                if left <= 0 or not self._sock.waitForReadyRead(left):
+                    self._sock.abort()
+                    self._sock = None
+                    raise ConnectionError(f"no reply from QuickPaste daemon to {cmd!r}")
+                buf += bytes(self._sock.readAll())
+            line, buf = buf.split(b"\n", 1)
+            reply = json.loads(line)
+            if reply.get('id') == req_id:
+                return reply
+
+    def subscribe(self):
+        self._events = self._connect()
+        self._events.readyRead.connect(self._on_events)
+        self._events.write(_encode({'cmd': 'subscribe'}))
+        self._events.flush()
+
+    def _on_events(self):
+        data = self._event_buffer + bytes(self._events.readAll())
+        *lines, self._event_buffer = data.split(b"\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            msg = json.loads(line)
+            if 'event' in msg:
+                self.event_received.emit(msg)
+
+    def close(self):
+        for sock in (self._sock, self._events):
+            if sock is not None:
+                sock.disconnectFromServer()
+        self._sock = self._events = None
+
+
+def run_client(args):
+    app = QCoreApplication(sys.argv)
+    client = DaemonClient(args.socket)
+    if args.call:
+        try:
+            request = json.loads(args.call)
+            reply = client.request(request.pop('cmd', None), **request)
+        except (ValueError, AttributeError) as e:
+            print(f"Bad request: {e}", file=sys.stderr)
+            return 2
+        except ConnectionError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(json.dumps(reply, ensure_ascii=False, indent=2))
+        return 0 if reply.get('ok') else 1
+    try:
+        client.subscribe()
+    except ConnectionError as e:
+        print(e, file=sys.stderr)
+        return 1
+    client.event_received.connect(lambda msg: print(json.dumps(msg, ensure_ascii=False), flush=True))
+    client._events.disconnected.connect(app.quit)
+    signal.signal(signal.SIGINT, lambda *a: app.quit())
+    # Let Python run its signal handlers while Qt's loop is waiting
+    tick = QTimer()
+    tick.timeout.connect(lambda: None)
+    tick.start(500)
+    return app.exec()
+
+
+def main():
+    from hotkey_service import HotkeyService, DISPATCH_ENGINE, STORAGE_BACKEND
+
+    parser = argparse.ArgumentParser(description="QuickPaste daemon")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help="local socket / named pipe name")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default=STORAGE_BACKEND)
+    parser.add_argument("--engine", choices=("hooks", "single"), default=DISPATCH_ENGINE)
+    parser.add_argument("--call", metavar="JSON", help="send one request to a running daemon and print the reply")
+    parser.add_argument("--watch", action="store_true", help="print a running daemon's events")
+    args = parser.parse_args()
+    if args.call or args.watch:
+        return run_client(args)
+
+    # Imported here so --call and --watch stay light
+    from PyQt6.QtGui import QGuiApplication
+    from executor import SequenceExecutor
+
+    app = QGuiApplication(sys.argv)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    service = HotkeyService(engine=args.engine, storage=args.storage)
+    executor = SequenceExecutor(service.image_cache)
+    service.paste_requested.connect(executor.submit)
+    service.cancel_requested.connect(executor.cancel)
+    server = DaemonServer(service, executor, args.socket)
+    try:
+        path = server.listen()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        service.close()
+        return 1
+    executor.start()
+    service.start_listening()
+
+    def shutdown():
+        # Runs on every exit path, so pending config writes are never lost
+        server.close()
+        service.stop_listening()
+        executor.shutdown()
+        service.close()
+
+    app.aboutToQuit.connect(shutdown)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *a: app.quit())
+    tick = QTimer()
+    tick.timeout.connect(lambda: None)
+    tick.start(500)
+    print(f"QuickPaste daemon listening on {path}")
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
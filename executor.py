@@ -0,0 +1,247 @@
+import os
+import time
+from collections import deque
+
+from PyQt6.QtCore import Qt, QObject, QThread, QTimer, QMetaObject, pyqtSignal, pyqtSlot
+
+from clipboard_ready import SettleTracker
+from backends import KeyboardInjector, SystemClipboard
+from tracing import Tracer
+from templates import Counters
+from text_store import LARGE_TEXT_THRESHOLD, CHUNK_GAP, split_text, iter_file_chunks
+
+# What happens when a hotkey fires while a sequence is still running
+POLICY_QUEUE = "queue"        # run after everything already waiting
+POLICY_DROP = "drop"          # ignore the press while busy
+POLICY_RESTART = "restart"    # abort the running copy of this hotkey and start over
+POLICY_COALESCE = "coalesce"  # keep at most one waiting copy of this hotkey
+POLICIES = (POLICY_QUEUE, POLICY_DROP, POLICY_RESTART, POLICY_COALESCE)
+DEFAULT_POLICY = POLICY_QUEUE
+
+# Triggers waiting behind the running sequence; further presses are dropped
+MAX_PENDING = 16
+# Longest single wait QTimer accepts (milliseconds)
+MAX_TIMER_MS = 2**31 - 1
+
+
+class SequenceExecutor(QObject):
+    """Plays action sequences on a dedicated worker thread.
+
+    Hotkey presses are delivered as compiled Plans (see sequence_plan) through
+    `submit` (connect a signal to it so
+    the call is queued onto the worker thread) and go through a bounded queue,
+    so presses arriving in bursts never interleave the steps of two sequences.
+    Waits are single-shot timers on the worker's event loop instead of nested
+    event loops, which keeps both the GUI and cancellation responsive.
+
+    Create it on the GUI thread: the default SystemClipboard must live there.
+    """
+    sequence_started = pyqtSignal(str)
+    sequence_finished = pyqtSignal(str)
+    sequence_cancelled = pyqtSignal(str)
+    trigger_dropped = pyqtSignal(str)
+    # (hotkey, done, total) while a large text is pasted chunk by chunk
+    sequence_progress = pyqtSignal(str, int, int)
+
+    def __init__(self, image_cache, injector=None, clipboard=None, tracer=None, counters=None):
+        super().__init__()
+        self.image_cache = image_cache
+        self.injector = injector or KeyboardInjector()
+        self.clipboard = clipboard or SystemClipboard()
+        self.settle = SettleTracker()
+        self.counters = counters or Counters()
+        self.tracer = tracer or Tracer()
+        self.pending = deque()
+        self.current_key = None
+        self._steps = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        # Coarse timers may fire up to 5% early or late; step delays should be exact
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._advance)
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = QThread()
+        self._thread.setObjectName("SequenceExecutor")
+        self.moveToThread(self._thread)
+        self._thread.start()
+
+    def shutdown(self):
+        if self._thread is None:
+            return
+        QMetaObject.invokeMethod(self, "cancel", Qt.ConnectionType.BlockingQueuedConnection)
+        self._thread.quit()
+        self._thread.wait()
+        self._thread = None
+        self.settle.save()
+        self.counters.close()
+
+    def is_busy(self):
+        return self.current_key is not None
+
+    @pyqtSlot(str, object, str, float)
+    def submit(self, key, plan, policy, triggered_at):
+        """`triggered_at` is the perf_counter() time the hook fired.
+
+        `plan` may also be a callable returning the Plan; it is called here,
+        on the worker thread, when the sequence starts.
+        """
+        busy = self.is_busy()
+        if policy == POLICY_DROP and busy:
+            self.trigger_dropped.emit(key)
+            return
+        if policy == POLICY_COALESCE and any(p[0] == key for p in self.pending):
+            self.trigger_dropped.emit(key)
+            return
+        if policy == POLICY_RESTART:
+            self.pending = deque(p for p in self.pending if p[0] != key)
+            if busy and self.current_key == key:
+                self._stop_current()
+                self.pending.appendleft((key, plan, triggered_at))
+                self._start_next()
+                return
+        if len(self.pending) >= MAX_PENDING:
+            self.trigger_dropped.emit(key)
+            return
+
+        self.pending.append((key, plan, triggered_at))
+        if not busy:
+            self._start_next()
+
+    @pyqtSlot()
+    def cancel(self):
+        self.pending.clear()
+        if self.is_busy():
+            self._stop_current()
+
+    def _stop_current(self):
+        key = self.current_key
+        self._timer.stop()
+        if self._steps is not None:
+            self._steps.close()
+        self._steps = None
+        self.current_key = None
+        self.sequence_cancelled.emit(key)
+
+    def _start_next(self):
+        if not self.pending:
+            return
+        key, plan, triggered_at = self.pending.popleft()
+        if callable(plan):
+            try:
+                plan = plan()
+            except Exception as e:
+                print(f"Hotkey '{key}': {e}")
+                self.trigger_dropped.emit(key)
+                self._start_next()
+                return
+        self.current_key = key
+        now = time.perf_counter()
+        self.tracer.record(key, 'dispatch', now - triggered_at, triggered_at)
+        self._steps = self._play(key, plan, triggered_at)
+        self.sequence_started.emit(key)
+        self._advance()
+
+    @pyqtSlot()
+    def _advance(self):
+        if self._steps is None:
+            return
+        # An exception escaping a slot aborts the process under PyQt6, so none may
+        try:
+            delay = next(self._steps)
+            self._timer.start(min(max(0, int(delay * 1000)), MAX_TIMER_MS))
+        except StopIteration:
+            key = self.current_key
+            self._steps = None
+            self.current_key = None
+            self.sequence_finished.emit(key)
+            self._start_next()
+        except Exception as e:
+            print(f"Sequence '{self.current_key}' stopped: {e}")
+            self._stop_current()
+            self._start_next()
+
+    def _paste_text(self, key, action_id, text):
+        clipboard = self.clipboard
+        record = self.tracer.record
+        clock = time.perf_counter
+        t = clock()
+        clipboard.set_text(text)
+        record(key, 'clipboard_write', clock() - t, t, chars=len(text))
+        t = clock()
+        yield from self.settle.wait_until(action_id, lambda: clipboard.text() == text)
+        record(key, 'clipboard_ready', clock() - t, t)
+        t = clock()
+        self.injector.send('ctrl+v')
+        record(key, 'paste_send', clock() - t, t)
+
+    def _paste_chunks(self, key, action_id, chunks, total):
+        """Paste (text, size) pieces one clipboard round each, reporting progress out of `total`.
+
+        Each chunk waits for the clipboard to confirm it and then CHUNK_GAP
+        for the target to take it in before the next is read, so only one
+        chunk is in memory and a cancel lands between two chunks.
+        """
+        done = 0
+        self.sequence_progress.emit(key, 0, total)
+        for text, size in chunks:
+            yield from self._paste_text(key, action_id, text)
+            done += size
+            self.sequence_progress.emit(key, done, total)
+            if done < total:
+                yield CHUNK_GAP
+
+    def _play(self, key, plan, triggered_at):
+        """Walk the plan, yielding the number of seconds to wait before resuming."""
+        clipboard = self.clipboard
+        send = self.injector.send
+        record = self.tracer.record
+        clock = time.perf_counter
+        for step in plan.steps:
+            action_id = f"{key}#{step.index}"
+            try:
+                if step.kind == 'text':
+                    text = step.value
+                    if text.__class__ is not str:
+                        t = clock()
+                        text = text.render(clipboard, self.counters)
+                        record(key, 'template_render', clock() - t, t)
+                    if len(text) > LARGE_TEXT_THRESHOLD:
+                        total = len(text)
+                        chunks = ((chunk, len(chunk)) for chunk in split_text(text))
+                        yield from self._paste_chunks(key, action_id, chunks, total)
+                    else:
+                        yield from self._paste_text(key, action_id, text)
+                elif step.kind == 'text_file':
+                    yield from self._paste_chunks(key, action_id, iter_file_chunks(step.value),
+                                                  os.path.getsize(step.value))
+                elif step.kind == 'keys':
+                    t = clock()
+                    send(step.value)
+                    record(key, 'paste_send', clock() - t, t, keys=step.value)
+                elif step.kind == 'image':
+                    t = clock()
+                    img = self.image_cache.get(step.value)
+                    record(key, 'image_load', clock() - t, t)
+                    if img is None:
+                        self.tracer.error(key, f"image unavailable: {step.value}")
+                    else:
+                        t = clock()
+                        serial = clipboard.set_image(img)
+                        record(key, 'clipboard_write', clock() - t, t)
+                        t = clock()
+                        yield from self.settle.wait_until(action_id, lambda: clipboard.image_ready(serial))
+                        record(key, 'clipboard_ready', clock() - t, t)
+                        t = clock()
+                        send('ctrl+v')
+                        record(key, 'paste_send', clock() - t, t)
+            except Exception as e:
+                print(f"Failed to run {step.kind} step of '{key}': {e}")
+                self.tracer.error(key, f"{step.kind} step {step.index + 1}: {e}")
+            t = clock()
+            yield step.delay
+            record(key, 'delay_late', clock() - t - step.delay, t, configured=step.delay)
+        record(key, 'sequence', clock() - triggered_at, triggered_at, steps=len(plan.steps))
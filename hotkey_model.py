@@ -0,0 +1,105 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+class HotkeyTableModel(QAbstractTableModel):
+    """Table model over `HotkeyService.hotkeys` with a search filter.
+
+    Cells are rendered on demand for the rows the view actually paints, and
+    edits are reported as single-row inserts/removes/changes so the view never
+    rebuilds thousands of items.
+    """
+    HEADERS = ["快捷鍵", "備註", "動作數"]
+
+    def __init__(self, service, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.query = ""
+        self._keys = []
+        self._rows = {}  # key -> row in _keys; None until rebuilt after a removal
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        key = self._keys[index.row()]
+        col = index.column()
+        if role == Qt.ItemDataRole.ToolTipRole and col == 0:
+            plan = self.service.plan(key)
+            return "\n".join(plan.errors) if plan and plan.errors else None
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return None
+        if col == 0:
+            return key
+        if col == 1:
+            return self.service.hotkeys.get(key, {}).get('tag', '')
+        return str(self.service.action_count(key))
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == 1:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != 1:
+            return False
+        key = self._keys[index.row()]
+        if key not in self.service.hotkeys:
+            return False
+        self.service.set_tag(key, value)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def key_at(self, row):
+        if 0 <= row < len(self._keys):
+            return self._keys[row]
+        return None
+
+    def row_of(self, key):
+        if self._rows is None:
+            self._rows = {k: row for row, k in enumerate(self._keys)}
+        return self._rows.get(key, -1)
+
+    def reload(self):
+        self.beginResetModel()
+        self._keys = self.service.search.search(self.query)
+        self._rows = None
+        self.endResetModel()
+
+    def set_filter(self, query):
+        if query != self.query:
+            self.query = query
+            self.reload()
+
+    def upsert(self, key):
+        """Reflect an added or edited hotkey as a single-row change."""
+        row = self.row_of(key)
+        visible = key in self.service.hotkeys and self.service.search.matches(key, self.query)
+        if row >= 0 and visible:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+        elif row >= 0:
+            self.remove(key)
+        elif visible:
+            self.beginInsertRows(QModelIndex(), len(self._keys), len(self._keys))
+            self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self.endInsertRows()
+
+    def remove(self, key):
+        row = self.row_of(key)
+        if row >= 0:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._keys[row]
+            # Every later row moved up; the index is rebuilt when next needed
+            self._rows = None
+            self.endRemoveRows()
@@ -0,0 +1,506 @@
+import os
+import time
+import functools
+
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from executor import DEFAULT_POLICY
+from image_cache import ImageCache
+from image_store import ImageStore
+from config_model import Hotkey, as_hotkey
+from text_store import TextStore
+from config_store import ConfigWriter, normalize_key, read_config
+from config_watcher import ConfigWatcher
+from sqlite_store import SqliteHotkeyStore, SqliteSearch, LRUDict, PAYLOAD_CACHE, DB_FILE, SCHEMA_VERSION as SQLITE_SCHEMA_VERSION
+from chord_dispatcher import ChordDispatcher
+from search_index import SearchIndex
+from sequence_plan import Plan, compile_actions, resolve_image_path, with_erase
+from abbreviations import AbbreviationMatcher, ABBR_KEY_PREFIX
+from usage_stats import UsageStats
+from backends import KeyboardHookSource
+
+CONFIG_FILE = "config.json"
+CANCEL_HOTKEY = "ctrl+alt+esc"
+PAUSE_HOTKEY = "ctrl+alt+p"
+PALETTE_HOTKEY = "ctrl+alt+space"
+# "hooks": one keyboard.add_hotkey per binding; "single": one hook + chord index
+DISPATCH_ENGINE = "hooks"
+# "json": config.json held in memory; "sqlite": config.db read per entry on demand
+STORAGE_BACKEND = "json"
+
+
+class HotkeyService(QObject):
+    # Emits (hotkey, compiled Plan, repeat policy, perf_counter() at the hook)
+    paste_requested = pyqtSignal(str, object, str, float)
+    cancel_requested = pyqtSignal()
+    pause_changed = pyqtSignal(bool)
+    palette_requested = pyqtSignal()
+    # Keys added, changed or removed by a config reload (not by our own edits)
+    hotkeys_changed = pyqtSignal(list)
+
+    def __init__(self, engine=DISPATCH_ENGINE, config_file=CONFIG_FILE, hooks=None,
+                 storage=STORAGE_BACKEND, db_file=DB_FILE, passive=False):
+        """`passive` never installs hooks: the GUI edits while daemon.py listens and plays."""
+        super().__init__()
+        self.passive = passive
+        self.engine = engine
+        self.storage = storage
+        self.config_file = config_file
+        self.db_file = db_file
+        self.hooks = hooks or KeyboardHookSource()
+        self.hotkeys = {}
+        self._handles = {}  # key -> handle returned by hooks.add_hotkey
+        self._pause_reasons = set()  # e.g. {'editor', 'user'}; hooks stay installed while paused
+        self.registration_times = {}
+        self.dispatcher = ChordDispatcher(self.trigger_sequence, self.is_paused, hooks=self.hooks) if engine == "single" else None
+        self.images = ImageStore()
+        self.image_cache = ImageCache(loader=self.images.load)
+        self.texts = TextStore()
+        self._config_ok = False  # never garbage-collect images against a config that failed to load
+        self.search = SearchIndex()
+        self.plans = {}  # key -> Plan compiled from the key's actions
+        self.abbreviations = AbbreviationMatcher()
+        self.usage = UsageStats()
+        self._abbr_hook = None
+        self.writer = ConfigWriter(config_file) if storage == "json" else None
+        self.load_config()
+        self.is_listening = False
+        self.watcher = None
+        if self.writer is not None:
+            self.watcher = ConfigWatcher(config_file, self.writer, parent=self)
+            self.watcher.loaded.connect(self.apply_config)
+
+    def normalize_key(self, key_combo):
+        return normalize_key(key_combo)
+
+    def load_config(self):
+        """Load hotkeys, supporting migration to v4 (dict with tag and actions)."""
+        if self.storage == "sqlite":
+            self.load_database()
+        elif os.path.exists(self.config_file):
+            try:
+                problems = []
+                self.hotkeys = read_config(self.config_file, problems)
+                self._config_ok = True
+                for msg in problems:
+                    print(msg)
+                self._externalize_texts()
+            except Exception as e:
+                print(f"Error loading config: {e}")
+                self.hotkeys = {}
+                self._config_ok = False
+        else:
+            self.hotkeys = {}
+            self._config_ok = True
+        paths = {'image': [], 'text': []}
+        if isinstance(self.hotkeys, SqliteHotkeyStore):
+            # Entries are fetched on demand, so plans are compiled on first use; search,
+            # abbreviations and side files are answered by the database's own tables
+            self.plans = LRUDict(PAYLOAD_CACHE)
+            self.search = SqliteSearch(self.hotkeys)
+            abbrs = self.hotkeys.abbreviations()
+            for kind, path in self.hotkeys.references():
+                paths[kind].append(resolve_image_path(path))
+        else:
+            self.plans = {}
+            abbrs = []
+            for key, entry in self.hotkeys.items():
+                abbrs.append((key, entry.get('abbr')))
+                for kind, path in self._entry_paths(entry):
+                    paths[kind].append(path)
+                self.compile(key)
+            # The search index is only needed by the palette and the editor's filter;
+            # building it here would hold up the hotkeys, which are registered next
+            self.search.reset(lambda: self.hotkeys.items())
+        self.abbreviations.rebuild(abbrs)
+        self.images.set_references(paths['image'])
+        self.texts.set_references(paths['text'])
+        self.image_cache.preload(paths['image'])
+
+    def _externalize_texts(self):
+        # Older configs may hold huge text inline; move it to side files once and save
+        moved = 0
+        for key, entry in self.hotkeys.items():
+            new = self.texts.externalize(entry)
+            if new is not entry:
+                self.hotkeys[key] = new
+                moved += 1
+        if moved:
+            print(f"Moved large text of {moved} hotkeys to {self.texts.root}/")
+            self.save_config()
+
+    def load_database(self):
+        if isinstance(self.hotkeys, SqliteHotkeyStore):
+            self.hotkeys.reload()
+            return
+        try:
+            self.hotkeys = SqliteHotkeyStore(self.db_file)
+            if not self.hotkeys.migrated:
+                if os.path.exists(self.config_file):
+                    count = self.hotkeys.import_json(self.config_file)
+                    print(f"Imported {count} hotkeys from {self.config_file} into {self.db_file}")
+                else:
+                    self.hotkeys.mark_migrated()
+            elif self.hotkeys.version < SQLITE_SCHEMA_VERSION:
+                # Imported before abbreviations were stored: recover them from config.json
+                path = self.config_file if os.path.exists(self.config_file) else None
+                count = self.hotkeys.restore_abbreviations(path)
+                if count:
+                    print(f"Restored {count} abbreviations from {self.config_file} into {self.db_file}")
+            self._config_ok = True
+        except Exception as e:
+            print(f"Error loading config: {e}")
+            self.hotkeys = {}
+            self._config_ok = False
+
+    def compile(self, key):
+        plan = compile_actions(self.hotkeys[key].get('actions', []))
+        self.plans[key] = plan
+        for err in plan.errors:
+            print(f"Hotkey '{key}': {err}")
+        return plan
+
+    def plan(self, key):
+        """The compiled Plan for `key`, compiling it now if it is not cached."""
+        plan = self.plans.get(key)
+        if plan is None and key in self.hotkeys:
+            plan = self.compile(key)
+        return plan
+
+    def action_count(self, key):
+        if isinstance(self.hotkeys, SqliteHotkeyStore):
+            return self.hotkeys.action_count(key)
+        return len(self.hotkeys.get(key, {}).get('actions', []))
+
+    def policy(self, key):
+        if isinstance(self.hotkeys, SqliteHotkeyStore):
+            return self.hotkeys.policy(key) or DEFAULT_POLICY
+        return self.hotkeys[key].get('policy', DEFAULT_POLICY)
+
+    def _request(self, key, erase=0):
+        """Queue `key`'s sequence, touching only memory: this runs inside the keyboard hook.
+
+        A plan that is not compiled yet (SQLite loads entries on demand) is
+        handed over as a callable, so the database read and key checks happen
+        on the executor thread; Windows drops hooks that overrun its timeout.
+        """
+        if key not in self.hotkeys or not self.action_count(key):
+            return False
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = functools.partial(self._deferred_plan, key, erase)
+        elif not plan:
+            return False
+        else:
+            plan = with_erase(plan, erase)
+        self.usage.record(key)
+        self.paste_requested.emit(key, plan, self.policy(key), time.perf_counter())
+        return True
+
+    def _deferred_plan(self, key, erase):
+        # Called by the executor on its thread; the hotkey may have been removed since
+        plan = self.plan(key)
+        return with_erase(plan, erase) if plan is not None else Plan([], [])
+
+    def file_paths(self, keys=None):
+        """('image' | 'text', path) for every image and large-text side file the entries use."""
+        entries = self.hotkeys.items() if keys is None else ((k, self.hotkeys.get(k, {})) for k in keys)
+        for key, data in entries:
+            yield from self._entry_paths(data)
+
+    @staticmethod
+    def _entry_paths(data):
+        for kind, path in as_hotkey(data).file_refs():
+            yield kind, resolve_image_path(path)
+
+    def image_paths(self, keys=None):
+        return (path for kind, path in self.file_paths(keys) if kind == 'image')
+
+    def text_paths(self, keys=None):
+        return (path for kind, path in self.file_paths(keys) if kind == 'text')
+
+    def save_config(self):
+        # Debounced and written atomically on the writer thread; the database saves per row
+        if self.writer is not None:
+            self.writer.schedule(self.hotkeys)
+
+    def flush_config(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        if not self.passive:
+            # A passive GUI's copy is stale: the daemon that plays the hotkeys owns usage.json
+            self.usage.save()
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.writer is not None:
+            self.writer.close()
+        elif isinstance(self.hotkeys, SqliteHotkeyStore):
+            self.hotkeys.close()
+        # Orphans are only removed on exit so an image still sitting in the editor survives a delete
+        if self._config_ok:
+            self.images.collect_garbage()
+            self.texts.collect_garbage()
+
+    def _index(self, key):
+        """Register the entry now stored under `key` with images, search, abbreviations and plans."""
+        entry = self.hotkeys[key]
+        self.images.retain(self.image_paths([key]))
+        self.texts.retain(self.text_paths([key]))
+        self.search.update(key, entry)
+        if entry.get('abbr'):
+            try:
+                self.abbreviations.add(entry['abbr'], key)
+            except ValueError as e:
+                print(f"Hotkey '{key}': {e}")
+        self.compile(key)
+
+    def _unindex(self, key):
+        # The search entry is left alone: `_index` updates it in place, removal drops it
+        self.images.release(self.image_paths([key]))
+        self.texts.release(self.text_paths([key]))
+        self.abbreviations.remove_key(key)
+        self.plans.pop(key, None)
+
+    def add_hotkey(self, key_combo, actions, tag="", policy=DEFAULT_POLICY, abbr=""):
+        """Add or replace a hotkey; `abbr` also (or, for ABBR_KEY_PREFIX keys, only) triggers it when typed."""
+        key = self.normalize_key(key_combo)
+        if key in self.hotkeys:
+            self._unindex(key)
+        entry = Hotkey(tag, actions, policy, abbr or None)
+        self.hotkeys[key] = self.texts.externalize(entry)
+        self._index(key)
+        self.save_config()
+        self.image_cache.preload(self.image_paths([key]))
+        self.sync_hotkeys([key])
+
+    def remove_hotkey(self, key_combo):
+        key = self.normalize_key(key_combo)
+        if key in self.hotkeys:
+            self._unindex(key)
+            del self.hotkeys[key]
+            self.search.remove(key)
+            self.usage.forget(key)
+            self.save_config()
+            self.sync_hotkeys([key])
+
+    @pyqtSlot(object)
+    def apply_config(self, new_hotkeys):
+        """Bring `hotkeys` in line with a freshly read config, touching only entries that differ.
+
+        Nothing is saved back, except that a snapshot still waiting in the writer is
+        replaced by the new state; returns the keys that were added, changed or removed.
+        """
+        changed = []
+        for key in [k for k in self.hotkeys if k not in new_hotkeys]:
+            self._unindex(key)
+            del self.hotkeys[key]
+            self.search.remove(key)
+            changed.append(key)
+        for key, entry in new_hotkeys.items():
+            entry = self.texts.externalize(as_hotkey(entry))
+            old = self.hotkeys.get(key)
+            if old == entry:
+                continue
+            if old is not None:
+                self._unindex(key)
+            self.hotkeys[key] = entry
+            self._index(key)
+            changed.append(key)
+        if changed:
+            if self.writer is not None and self.writer.pending:
+                # That snapshot predates the external change; writing it would undo the change
+                # on disk, and the watcher would then skip the file as our own write
+                self.writer.schedule(self.hotkeys)
+            self.image_cache.preload(self.image_paths([k for k in changed if k in self.hotkeys]))
+            self.sync_hotkeys(changed)
+            self.hotkeys_changed.emit(changed)
+        return changed
+
+    def reload(self):
+        """Re-read the config file now and apply what changed, then re-check the hooks."""
+        if self.writer is not None and os.path.exists(self.config_file):
+            # Unsaved edits go out first so the file is the newest state
+            self.writer.flush()
+            try:
+                self.apply_config(read_config(self.config_file))
+                self.watcher.mark_seen()
+            except Exception as e:
+                print(f"Error reloading config: {e}")
+        self.restart_listening()
+
+    def set_tag(self, key, tag):
+        if key in self.hotkeys:
+            # Entries are immutable; the write-behind snapshot and the database see the new one
+            self.hotkeys[key] = self.hotkeys[key].replace(tag=tag)
+            self.search.update(key, self.hotkeys[key])
+            self.save_config()
+
+    def trigger_sequence(self, key):
+        # While paused, returning True tells `keyboard` to pass the keys through
+        if self._pause_reasons:
+            return True
+        self.run_hotkey(key)
+
+    def run_hotkey(self, key):
+        """Queue `key`'s sequence even while paused (palette, socket API); False if there is none."""
+        # Actions are looked up at trigger time, so edits never need a re-hook
+        return self._request(key)
+
+    def run_actions(self, actions, policy=DEFAULT_POLICY):
+        """Queue an ad-hoc action list that belongs to no hotkey; returns its Plan."""
+        plan = compile_actions(actions)
+        if not plan.errors:
+            self.paste_requested.emit("", plan, policy, time.perf_counter())
+        return plan
+
+    def find_tag(self, tag):
+        """First hotkey whose note equals `tag` (case-insensitive), or None."""
+        tag = tag.strip().lower()
+        for key, data in self.hotkeys.items():
+            if (data.get('tag') or '').strip().lower() == tag:
+                return key
+        return None
+
+    def trigger_abbreviation(self, key, typed):
+        # Runs on the hook thread; the typed abbreviation is erased before the sequence plays
+        self._request(key, typed)
+
+    def _on_abbr_event(self, event):
+        if self._pause_reasons:
+            self.abbreviations.reset()
+            return
+        match = self.abbreviations.feed(event.name, event.event_type == 'down')  # keyboard.KEY_DOWN
+        if match is not None:
+            self.trigger_abbreviation(*match)
+
+    def _sync_abbr_hook(self):
+        """Keep the typing hook installed only while listening and some abbreviation exists."""
+        wanted = self.is_listening and len(self.abbreviations) > 0
+        if wanted and self._abbr_hook is None:
+            try:
+                # Not suppressing: typed characters always reach the focused window
+                self._abbr_hook = self.hooks.hook(self._on_abbr_event)
+            except Exception as e:
+                print(f"Failed to install abbreviation hook: {e}")
+        elif not wanted and self._abbr_hook is not None:
+            try:
+                self.hooks.unhook(self._abbr_hook)
+            except Exception:
+                pass
+            self._abbr_hook = None
+            self.abbreviations.reset()
+
+    def start_listening(self):
+        if self.passive:
+            return
+        try:
+            self.hooks.unhook_all()
+        except:
+            pass
+        self._handles = {}
+        self._abbr_hook = None
+
+        try:
+            self.hooks.add_hotkey(CANCEL_HOTKEY, self.cancel_requested.emit, suppress=True)
+            self.hooks.add_hotkey(PAUSE_HOTKEY, lambda: self.toggle_pause('user'), suppress=True)
+            self.hooks.add_hotkey(PALETTE_HOTKEY, self.palette_requested.emit, suppress=True)
+        except Exception as e:
+            print(f"Failed to register control hotkeys: {e}")
+
+        if self.dispatcher is not None:
+            self.dispatcher.clear()
+            try:
+                self.dispatcher.install()
+            except Exception as e:
+                print(f"Failed to install keyboard hook: {e}")
+
+        self.is_listening = True
+        self.sync_hotkeys()
+
+    def stop_listening(self):
+        if self.dispatcher is not None:
+            self.dispatcher.uninstall()
+        try:
+            self.hooks.unhook_all()
+        except:
+            pass
+        self._handles = {}
+        self._abbr_hook = None
+        self.abbreviations.reset()
+        self.is_listening = False
+
+    def is_paused(self, reason=None):
+        if reason is None:
+            return bool(self._pause_reasons)
+        return reason in self._pause_reasons
+
+    def pause(self, reason):
+        """Gate dispatch without touching the OS hooks; each reason resumes independently."""
+        if reason not in self._pause_reasons:
+            self._pause_reasons.add(reason)
+            self.pause_changed.emit(True)
+
+    def resume(self, reason):
+        if reason in self._pause_reasons:
+            self._pause_reasons.discard(reason)
+            self.pause_changed.emit(bool(self._pause_reasons))
+
+    def toggle_pause(self, reason):
+        if reason in self._pause_reasons:
+            self.resume(reason)
+        else:
+            self.pause(reason)
+
+    def restart_listening(self):
+        if self.is_listening:
+            self.sync_hotkeys()
+        else:
+            self.start_listening()
+
+    def _wants_hook(self, key):
+        # Abbreviation-only entries have no chord to register
+        return bool(key and key.strip() and not key.startswith(ABBR_KEY_PREFIX) and self.action_count(key))
+
+    def sync_hotkeys(self, keys=None):
+        """Register/unregister only what differs between `hotkeys` and the live hooks.
+
+        With `keys` only those entries are checked, so a single edit is O(1).
+        """
+        if not self.is_listening:
+            return
+        self._sync_abbr_hook()
+        if keys is None:
+            keys = set(self.hotkeys) | set(self._handles)
+        for key in keys:
+            wanted = self._wants_hook(key)
+            if key in self._handles and not wanted:
+                try:
+                    handle = self._handles.pop(key)
+                    if self.dispatcher is not None:
+                        self.dispatcher.remove(key)
+                    else:
+                        self.hooks.remove_hotkey(handle)
+                except Exception as e:
+                    print(f"Failed to unregister hotkey '{key}': {e}")
+            elif wanted and key not in self._handles:
+                start = time.perf_counter()
+                try:
+                    if self.dispatcher is not None:
+                        self.dispatcher.add(key)
+                        self._handles[key] = key
+                    else:
+                        self._handles[key] = self.hooks.add_hotkey(key, lambda k=key: self.trigger_sequence(k), suppress=True)
+                except Exception as e:
+                    print(f"Failed to register hotkey '{key}': {e}")
+                    continue
+                self.registration_times[key] = time.perf_counter() - start
+
+    def registration_stats(self):
+        times = [self.registration_times[k] for k in self._handles if k in self.registration_times]
+        return {
+            'registered': len(self._handles),
+            'total_ms': sum(times) * 1000,
+            'max_ms': max(times, default=0.0) * 1000,
+        }
@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PyQt6.QtGui import QImage
+
+# Decoded pixels kept in memory across all cached images
+IMAGE_CACHE_BUDGET = 256 * 1024 * 1024
+
+
+class ImageCache:
+    """LRU cache of decoded images keyed on path, validated against mtime and size.
+
+    Safe to use from the executor and preload threads at once. Decoding happens
+    outside the lock so a slow file never blocks a cache hit. `loader` turns a
+    path into a QImage; the image store passes one that reads its pre-converted
+    clipboard payloads.
+    """
+
+    def __init__(self, budget_bytes=IMAGE_CACHE_BUDGET, loader=QImage):
+        self.budget_bytes = budget_bytes
+        self.loader = loader
+        self._entries = OrderedDict()  # path -> (signature, QImage, nbytes)
+        self._used = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _signature(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self, path):
+        """Return the decoded QImage for `path`, or None if it is missing or unreadable."""
+        sig = self._signature(path)
+        if sig is None:
+            self.invalidate(path)
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == sig:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return self._load(path, sig)
+
+    def _load(self, path, sig):
+        img = self.loader(path)
+        if img.isNull():
+            self.invalidate(path)
+            return None
+        nbytes = img.sizeInBytes()
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old:
+                self._used -= old[2]
+            # Images larger than the whole budget are served but never kept
+            if nbytes <= self.budget_bytes:
+                self._entries[path] = (sig, img, nbytes)
+                self._used += nbytes
+                while self._used > self.budget_bytes:
+                    _, (_, _, freed) = self._entries.popitem(last=False)
+                    self._used -= freed
+                    self.evictions += 1
+        return img
+
+    def invalidate(self, path):
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old:
+                self._used -= old[2]
+
+    def preload(self, paths):
+        """Decode `paths` on a background thread so the first paste skips disk I/O."""
+        paths = list(dict.fromkeys(paths))
+        if not paths:
+            return
+        threading.Thread(target=self._warm, args=(paths,), daemon=True).start()
+
+    def _warm(self, paths):
+        for path in paths:
+            sig = self._signature(path)
+            if sig is None:
+                continue
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry and entry[0] == sig:
+                    continue
+            self._load(path, sig)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._used,
+                'budget': self.budget_bytes,
+            }
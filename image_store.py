@@ -0,0 +1,151 @@
+import os
+import re
+import shutil
+import zlib
+import struct
+import hashlib
+from collections import Counter
+
+from PyQt6.QtGui import QImage
+from PyQt6.QtCore import Qt
+
+IMAGE_DIR = "images"
+# Longest side of the clipboard-ready copy; larger images are scaled down, None keeps the original size
+MAX_CLIPBOARD_SIDE = 4096
+# zlib level for the pixel payload: raw ARGB32 is ~17x a typical PNG, level 1 brings
+# it close to the PNG's size and still inflates faster than the PNG decodes
+CLIP_COMPRESSION = 1
+
+CLIP_EXT = ".clip"
+CLIP_MAGIC = b"QPCLIP2\0"
+CLIP_HEADER = struct.Struct("<8sIII")  # magic, width, height, bytes per line
+CLIP_FORMAT = QImage.Format.Format_ARGB32
+
+_STORED_NAME = re.compile(r"^[0-9a-f]{32}\.[A-Za-z0-9]+$")
+
+
+class ImageStore:
+    """Content-addressed, deduplicated copies of user images.
+
+    Files are named after the SHA-256 of their bytes, so importing the same
+    picture twice yields the same path. Next to each original a `.clip` file
+    holds the pixels already converted (and downscaled past `max_side`) to the
+    format the clipboard takes, zlib-compressed, so a paste is a file read
+    and an inflate instead of an image decode.
+    References from config entries are counted; `collect_garbage` removes
+    stored files nothing points at any more.
+    """
+
+    def __init__(self, root=IMAGE_DIR, max_side=MAX_CLIPBOARD_SIDE):
+        self.root = root
+        self.max_side = max_side
+        self.refs = Counter()
+
+    @staticmethod
+    def _digest(path):
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()[:32]
+
+    def is_stored(self, path):
+        return (os.path.normcase(os.path.dirname(os.path.abspath(path))) == os.path.normcase(os.path.abspath(self.root))
+                and bool(_STORED_NAME.match(os.path.basename(path))))
+
+    def import_file(self, src):
+        """Copy `src` into the store (once per distinct content) and return the stored path."""
+        if self.is_stored(src):
+            return src
+        ext = os.path.splitext(src)[1].lower() or ".png"
+        dest = os.path.join(self.root, self._digest(src) + ext)
+        if not os.path.exists(dest):
+            os.makedirs(self.root, exist_ok=True)
+            tmp = dest + ".tmp"
+            shutil.copy2(src, tmp)
+            os.replace(tmp, dest)
+        if not os.path.exists(self.clip_path(dest)):
+            self.write_clip(dest)
+        return dest
+
+    @staticmethod
+    def clip_path(path):
+        return os.path.splitext(path)[0] + CLIP_EXT
+
+    def write_clip(self, path, img=None):
+        img = QImage(path) if img is None else img
+        if img.isNull():
+            return False
+        if self.max_side and max(img.width(), img.height()) > self.max_side:
+            img = img.scaled(self.max_side, self.max_side, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+        img = img.convertToFormat(CLIP_FORMAT)
+        bits = img.constBits()
+        bits.setsize(img.sizeInBytes())
+        tmp = self.clip_path(path) + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(CLIP_HEADER.pack(CLIP_MAGIC, img.width(), img.height(), img.bytesPerLine()))
+            f.write(zlib.compress(bits.asstring(), CLIP_COMPRESSION))
+        os.replace(tmp, self.clip_path(path))
+        return True
+
+    def load(self, path):
+        """QImage for `path`, from its pre-converted `.clip` file when one exists."""
+        clip = self.clip_path(path)
+        try:
+            with open(clip, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return QImage(path)
+        pixels = b""
+        if len(data) > CLIP_HEADER.size:
+            magic, w, h, bpl = CLIP_HEADER.unpack_from(data)
+            # A header that cannot describe an ARGB32 image is as bad as a broken payload
+            if magic == CLIP_MAGIC and w > 0 and h > 0 and bpl >= 4 * w:
+                try:
+                    pixels = zlib.decompress(data[CLIP_HEADER.size:])
+                except zlib.error:
+                    pass
+        if not pixels or len(pixels) < bpl * h:
+            # Written by an older version (uncompressed), truncated or damaged: replace it
+            img = QImage(path)
+            try:
+                self.write_clip(path, img)
+            except OSError:
+                pass
+            return img
+        # copy() detaches the image from `pixels`, which is freed on return
+        return QImage(pixels, w, h, bpl, CLIP_FORMAT).copy()
+
+    def set_references(self, paths):
+        self.refs = Counter(os.path.normcase(os.path.abspath(p)) for p in paths)
+
+    def retain(self, paths):
+        for p in paths:
+            self.refs[os.path.normcase(os.path.abspath(p))] += 1
+
+    def release(self, paths):
+        for p in paths:
+            key = os.path.normcase(os.path.abspath(p))
+            self.refs[key] -= 1
+            if self.refs[key] <= 0:
+                del self.refs[key]
+
+    def collect_garbage(self):
+        """Delete stored images (and their `.clip` files) with no references; returns the count."""
+        if not os.path.isdir(self.root):
+            return 0
+        removed = 0
+        for name in os.listdir(self.root):
+            if not _STORED_NAME.match(name) or name.endswith(CLIP_EXT):
+                continue
+            path = os.path.join(self.root, name)
+            if self.refs.get(os.path.normcase(os.path.abspath(path))):
+                continue
+            for p in (path, self.clip_path(path)):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            removed += 1
+        return removed
@@ -0,0 +1,86 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem, QApplication
+from PyQt6.QtCore import Qt, pyqtSignal
+
+# Rows shown in the palette
+PALETTE_RESULTS = 20
+
+
+class PaletteDialog(QWidget):
+    """Floating search box over every hotkey; Enter runs the highlighted one.
+
+    Results come from `service.search.top` with the most used hotkeys first
+    and are refreshed on every keystroke.
+    """
+    chosen = pyqtSignal(str)
+
+    def __init__(self, service, parent=None):
+        super().__init__(parent, Qt.WindowType.Tool | Qt.WindowType.FramelessWindowHint |
+                         Qt.WindowType.WindowStaysOnTopHint)
+        self.service = service
+        self.setWindowTitle("QuickPaste")
+        self.resize(520, 360)
+        self._preferred = []
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        self.txt_query = QLineEdit()
+        self.txt_query.setPlaceholderText("🔍 搜尋快捷鍵、備註或文字內容，Enter 執行，Esc 關閉")
+        self.txt_query.textChanged.connect(self.refresh)
+        self.txt_query.returnPressed.connect(self.run_current)
+        self.txt_query.installEventFilter(self)
+        self.results = QListWidget()
+        self.results.itemActivated.connect(lambda item: self.run_current())
+        layout.addWidget(self.txt_query)
+        layout.addWidget(self.results)
+
+    def popup(self):
+        # Ranking is taken once per opening; scores barely move while typing
+        self._preferred = self.service.usage.ranked()
+        self.txt_query.clear()
+        self.refresh("")
+        screen = QApplication.primaryScreen().availableGeometry()
+        self.move(screen.center().x() - self.width() // 2, screen.top() + screen.height() // 4)
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        self.txt_query.setFocus()
+
+    def refresh(self, query):
+        self.results.clear()
+        for key in self.service.search.top(query, PALETTE_RESULTS, self._preferred):
+            entry = self.service.hotkeys.get(key, {})
+            preview = next((a.get('value', '') for a in entry.get('actions', []) if a.get('type') == 'text'), '')
+            preview = preview.replace('\n', ' ')
+            if len(preview) > 40:
+                preview = preview[:40] + ".."
+            item = QListWidgetItem(f"{key}    {entry.get('tag', '')}    {preview}")
+            item.setData(Qt.ItemDataRole.UserRole, key)
+            self.results.addItem(item)
+        if self.results.count():
+            self.results.setCurrentRow(0)
+
+    def run_current(self):
+        item = self.results.currentItem()
+        self.hide()
+        if item is not None:
+            self.chosen.emit(item.data(Qt.ItemDataRole.UserRole))
+
+    def eventFilter(self, obj, event):
+        # Arrow keys move through the results while the cursor stays in the search box
+        if obj is self.txt_query and event.type() == event.Type.KeyPress:
+            key = event.key()
+            if key in (Qt.Key.Key_Down, Qt.Key.Key_Up):
+                row = self.results.currentRow() + (1 if key == Qt.Key.Key_Down else -1)
+                if 0 <= row < self.results.count():
+                    self.results.setCurrentRow(row)
+                return True
+            if key == Qt.Key.Key_Escape:
+                self.hide()
+                return True
+        return super().eventFilter(obj, event)
+
+    def changeEvent(self, event):
+        # Clicking anywhere else closes the palette
+        if event.type() == event.Type.ActivationChange and not self.isActiveWindow():
+            self.hide()
+        super().changeEvent(event)
@@ -0,0 +1,205 @@
+from collections import defaultdict, Counter
+
+from config_model import Action
+
+GRAM = 3
+# Characters of each text action that are indexed; keeps huge bodies from bloating the index
+INDEX_TEXT_LIMIT = 500
+# Fuzzy matching only counts trigrams rarer than this, so common ones never cost a full scan
+FUZZY_POSTING_LIMIT = 2000
+# Documents scanned for palette queries too short to use the trigram index
+SHORT_QUERY_SCAN = 5000
+
+
+def _grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class SearchIndex:
+    """Incremental trigram index over hotkey keys, tags and text action values.
+
+    Queries of three or more characters intersect posting sets and then verify
+    the substring, so cost follows the number of candidates rather than the
+    library size. Shorter queries fall back to a scan of the stored documents.
+
+    With a `source` (a callable returning (key, entry) pairs) the index is
+    only built on the first query that needs it, so loading a large library
+    does not wait for it; updates before then are already in the source.
+    """
+
+    def __init__(self, source=None):
+        self._docs = {}    # key -> lowercased searchable text
+        self._order = {}   # key -> insertion sequence, for stable result order
+        self._seq = 0
+        self._postings = defaultdict(set)
+        self._source = source
+
+    def reset(self, source):
+        """Drop the index; it is built again from `source()` when next queried."""
+        self._docs = {}
+        self._order = {}
+        self._postings = defaultdict(set)
+        self._source = source
+
+    def _ensure(self):
+        if self._source is not None:
+            source, self._source = self._source, None
+            self.rebuild(source())
+
+    @staticmethod
+    def document(key, data):
+        parts = [key, str(data.get('tag', ''))]
+        for act in data.get('actions', []):
+            if isinstance(act, (dict, Action)) and act.get('type') == 'text':
+                parts.append(str(act.get('value', ''))[:INDEX_TEXT_LIMIT])
+        return "\n".join(parts).lower()
+
+    def rebuild(self, entries):
+        """Index (key, entry) pairs from scratch."""
+        self._docs = {}
+        self._order = {}
+        self._postings = defaultdict(set)
+        for key, data in entries:
+            self.update(key, data)
+
+    def update(self, key, data):
+        if self._source is not None:
+            return
+        doc = self.document(key, data)
+        old = self._docs.get(key)
+        if old == doc:
+            return
+        old_grams = _grams(old) if old is not None else set()
+        new_grams = _grams(doc)
+        for g in old_grams - new_grams:
+            posting = self._postings[g]
+            posting.discard(key)
+            if not posting:
+                del self._postings[g]
+        for g in new_grams - old_grams:
+            self._postings[g].add(key)
+        self._docs[key] = doc
+        if key not in self._order:
+            self._seq += 1
+            self._order[key] = self._seq
+
+    def remove(self, key):
+        if self._source is not None:
+            return
+        doc = self._docs.pop(key, None)
+        self._order.pop(key, None)
+        if doc is None:
+            return
+        for g in _grams(doc):
+            posting = self._postings.get(g)
+            if posting is not None:
+                posting.discard(key)
+                if not posting:
+                    del self._postings[g]
+
+    def candidates(self, query):
+        """Keys whose document may contain `query` (a superset; not verified)."""
+        self._ensure()
+        grams = _grams(query)
+        if not grams:
+            return self._docs.keys()
+        postings = sorted((self._postings.get(g, ()) for g in grams), key=len)
+        if not postings[0]:
+            return set()
+        result = set(postings[0])
+        for p in postings[1:]:
+            result &= p
+            if not result:
+                break
+        return result
+
+    def search(self, query):
+        """Keys containing `query` in their key, tag or text values, in insertion order."""
+        query = query.strip().lower()
+        if not query and self._source is not None:
+            return [key for key, _ in self._source()]
+        self._ensure()
+        if not query:
+            # Dict order already matches insertion order
+            return list(self._docs)
+        docs = self._docs
+        hits = [k for k in self.candidates(query) if query in docs[k]]
+        hits.sort(key=self._order.__getitem__)
+        return hits
+
+    def matches(self, key, query):
+        query = query.strip().lower()
+        if not query:
+            return True
+        self._ensure()
+        return query in self._docs.get(key, '')
+
+    def _iter_matches(self, query, scan_limit=None):
+        """Lazily yield keys containing `query`, so callers can stop after a few.
+
+        Queries shorter than a trigram scan the documents, at most `scan_limit` of them.
+        """
+        docs = self._docs
+        grams = _grams(query)
+        if not grams:
+            for n, (key, doc) in enumerate(docs.items()):
+                if scan_limit is not None and n >= scan_limit:
+                    return
+                if query in doc:
+                    yield key
+            return
+        postings = sorted((self._postings.get(g, ()) for g in grams), key=len)
+        smallest, others = postings[0], postings[1:]
+        for key in smallest:
+            if all(key in p for p in others) and query in docs[key]:
+                yield key
+
+    def fuzzy(self, query, limit):
+        """Keys sharing at least half of the query's trigrams, most shared first (typo tolerant)."""
+        grams = _grams(query)
+        if not grams:
+            return []
+        self._ensure()
+        counts = Counter()
+        for g in grams:
+            posting = self._postings.get(g, ())
+            if len(posting) <= FUZZY_POSTING_LIMIT:
+                counts.update(posting)
+        needed = max(1, (len(grams) + 1) // 2)
+        return [k for k, n in counts.most_common(limit) if n >= needed]
+
+    def top(self, query, limit, preferred=()):
+        """Up to `limit` keys for the palette.
+
+        Keys from `preferred` (e.g. most used first) that match come first,
+        then other substring matches, then fuzzy matches. Every stage stops
+        once `limit` is reached, so the cost follows `limit`, not the library.
+        One- and two-character queries only look at the first
+        SHORT_QUERY_SCAN documents; the next keystroke uses the index.
+        """
+        query = query.strip().lower()
+        self._ensure()
+        docs = self._docs
+        hits = []
+        seen = set()
+        for key in preferred:
+            doc = docs.get(key)
+            if doc is not None and query in doc:
+                hits.append(key)
+                seen.add(key)
+                if len(hits) >= limit:
+                    return hits
+        for key in self._iter_matches(query, SHORT_QUERY_SCAN):
+            if key not in seen:
+                hits.append(key)
+                seen.add(key)
+                if len(hits) >= limit:
+                    return hits
+        if len(query) >= GRAM:
+            for key in self.fuzzy(query, limit):
+                if key not in seen:
+                    hits.append(key)
+                    seen.add(key)
+                    if len(hits) >= limit:
+                        break
+        return hits
@@ -0,0 +1,146 @@
+import os
+import math
+import functools
+from collections import namedtuple
+
+import keyboard
+
+from templates import compile_template
+from config_model import Action
+
+ACTION_TYPES = ('text', 'key', 'image')
+DEFAULT_DELAY = 0.5
+# Longest delay one step may ask for, in seconds
+MAX_DELAY = 3600
+
+# kind: 'text' | 'text_file' | 'keys' | 'image'; value: text to paste (str, or a
+# Template rendered when the step runs), path of a large text side file (see
+# text_store), keyboard.send chain or resolved image path; delay: seconds to
+# wait afterwards; index: first source action
+Step = namedtuple('Step', 'kind value delay index')
+
+
+class Plan:
+    """A validated, ready-to-run form of one action sequence.
+
+    `timeline[i]` is when step i starts relative to the trigger if every step
+    took no time itself; `total` is the configured length of the sequence.
+    """
+    __slots__ = ('steps', 'errors', 'timeline', 'total')
+
+    def __init__(self, steps, errors):
+        self.steps = steps
+        self.errors = errors
+        self.timeline = []
+        t = 0.0
+        for step in steps:
+            self.timeline.append(t)
+            t += step.delay
+        self.total = t
+
+    def __len__(self):
+        return len(self.steps)
+
+
+# Configs reuse a handful of key names, so each is parsed once
+@functools.lru_cache(maxsize=1024)
+def _check_keys(value):
+    try:
+        keyboard.parse_hotkey(value)
+    except ValueError as e:
+        return str(e) or f"unknown key '{value}'"
+    except Exception:
+        # Key tables unavailable on this platform; leave it to run time
+        pass
+    return None
+
+
+def resolve_image_path(value):
+    # Configs written on Windows use backslashes
+    return os.path.abspath(os.path.normpath(value.replace('\\', os.sep)))
+
+
+def compile_actions(actions):
+    """Validate `actions` and fold them into a Plan.
+
+    Text values with placeholders become Templates (see templates.py).
+    Adjacent text steps with no delay between them become one paste, and
+    consecutive zero-delay key presses become a single `keyboard.send` chain.
+    Problems are collected in `Plan.errors`; invalid steps keep their delay
+    so the sequence timing does not change.
+    """
+    steps = []
+    errors = []
+    if not isinstance(actions, (list, tuple)):
+        return Plan([], ["actions must be a list"])
+
+    for i, act in enumerate(actions):
+        if not isinstance(act, (dict, Action)):
+            errors.append(f"step {i + 1}: not an action object")
+            continue
+        a_type = act.get('type')
+        value = act.get('value')
+        delay = act.get('delay', DEFAULT_DELAY)
+        if (delay.__class__ is bool or not isinstance(delay, (int, float))
+                or not math.isfinite(delay) or delay < 0):
+            errors.append(f"step {i + 1}: invalid delay {delay!r}")
+            delay = DEFAULT_DELAY
+        elif delay > MAX_DELAY:
+            errors.append(f"step {i + 1}: delay {delay!r} is over the {MAX_DELAY} s limit")
+            delay = DEFAULT_DELAY
+        if a_type not in ACTION_TYPES:
+            errors.append(f"step {i + 1}: unknown type {a_type!r}")
+            steps.append(Step('wait', None, delay, i))
+            continue
+        if a_type == 'text' and isinstance(act.get('file'), str):
+            # Large text kept in a side file; streamed in chunks, never merged or templated
+            path = resolve_image_path(act['file'])
+            if not os.path.exists(path):
+                errors.append(f"step {i + 1}: text file not found: {act['file']}")
+            steps.append(Step('text_file', path, delay, i))
+            continue
+        if not isinstance(value, str) or (a_type != 'text' and not value):
+            errors.append(f"step {i + 1}: missing value")
+            steps.append(Step('wait', None, delay, i))
+            continue
+
+        prev = steps[-1] if steps else None
+        if a_type == 'text':
+            value, template_errors = compile_template(value)
+            errors.extend(f"step {i + 1}: {e}" for e in template_errors)
+            if prev is not None and prev.kind == 'text' and prev.delay == 0:
+                steps[-1] = Step('text', prev.value + value, delay, prev.index)
+            else:
+                steps.append(Step('text', value, delay, i))
+        elif a_type == 'key':
+            err = _check_keys(value)
+            if err:
+                errors.append(f"step {i + 1}: {err}")
+                steps.append(Step('wait', None, delay, i))
+            elif prev is not None and prev.kind == 'keys' and prev.delay == 0:
+                steps[-1] = Step('keys', f"{prev.value}, {value}", delay, prev.index)
+            else:
+                steps.append(Step('keys', value, delay, i))
+        else:
+            path = resolve_image_path(value)
+            if not os.path.exists(path):
+                errors.append(f"step {i + 1}: image not found: {value}")
+            steps.append(Step('image', path, delay, i))
+
+    # Pure waits can be folded into the step before them
+    folded = []
+    for step in steps:
+        if step.kind == 'wait' and folded:
+            prev = folded[-1]
+            folded[-1] = prev._replace(delay=prev.delay + step.delay)
+        else:
+            folded.append(step)
+    return Plan(folded, errors)
+
+
+def with_erase(plan, count):
+    """`plan` preceded by `count` backspaces, for triggers typed into the target window."""
+    if count <= 0:
+        return plan
+    erase = Step('keys', ", ".join(['backspace'] * count), 0.0, -1)
+    return Plan([erase] + list(plan.steps), plan.errors)
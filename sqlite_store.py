@@ -0,0 +1,429 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict, Counter
+from collections.abc import MutableMapping
+
+from config_store import normalize_key, load_json
+from config_model import Hotkey, as_hotkey
+from abbreviations import ABBR_KEY_PREFIX
+from search_index import SearchIndex, GRAM, FUZZY_POSTING_LIMIT, SHORT_QUERY_SCAN
+
+DB_FILE = "config.db"
+# Hotkey entries kept decoded in memory
+PAYLOAD_CACHE = 256
+# Rows fetched per query when streaming the whole table
+ITER_BATCH = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hotkeys (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    tag TEXT NOT NULL DEFAULT '',
+    policy TEXT,
+    abbr TEXT,
+    n_actions INTEGER NOT NULL DEFAULT 0,
+    actions TEXT NOT NULL DEFAULT '[]',
+    extra TEXT
+)
+"""
+# Derived from the entries and kept in step by every write, so opening the
+# database never has to read every row: the search document of each entry
+# (rowid = hotkeys.id) and the image and text side files it uses
+_DOCS_FTS = "CREATE VIRTUAL TABLE hotkey_docs USING fts5(doc, tokenize='trigram')"
+# SQLite without FTS5 or its trigram tokenizer (before 3.34): same queries, no index
+_DOCS_PLAIN = "CREATE TABLE hotkey_docs (id INTEGER PRIMARY KEY, doc TEXT NOT NULL)"
+_DERIVED = (
+    "CREATE TABLE IF NOT EXISTS hotkey_refs (hotkey_id INTEGER NOT NULL, kind TEXT NOT NULL, path TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS hotkey_refs_id ON hotkey_refs (hotkey_id)",
+    "CREATE INDEX IF NOT EXISTS hotkeys_abbr ON hotkeys (abbr, key) WHERE abbr IS NOT NULL",
+)
+# PRAGMA user_version: 0 = fresh database, 1 = JSON config imported by a version
+# that did not store abbreviations, 2 = JSON config imported with them
+SCHEMA_VERSION = 2
+# Columns added after the first release: name -> declaration for ALTER TABLE
+_ADDED_COLUMNS = {'abbr': "TEXT", 'extra': "TEXT"}
+_UPSERT = ("INSERT INTO hotkeys (key, tag, policy, abbr, n_actions, actions, extra) VALUES (?, ?, ?, ?, ?, ?, ?) "
+           "ON CONFLICT(key) DO UPDATE SET tag=excluded.tag, policy=excluded.policy, abbr=excluded.abbr, "
+           "n_actions=excluded.n_actions, actions=excluded.actions, extra=excluded.extra")
+
+
+class LRUDict:
+    """Small thread-safe LRU mapping; `get` refreshes an entry, assignment may evict the oldest."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SqliteHotkeyStore(MutableMapping):
+    """`HotkeyService.hotkeys` backed by a SQLite file instead of config.json.
+
+    Only the key -> (row id, action count, policy) index stays resident, so
+    a trigger never waits for the database; entries are read on demand
+    through a small LRU and every assignment or deletion is one row update,
+    so nothing is ever rewritten wholesale. Entries are the
+    same Hotkey objects the JSON backend uses; assign a new one (see
+    `Hotkey.replace`) for a change to be saved.
+    """
+
+    def __init__(self, path=DB_FILE, cache_size=PAYLOAD_CACHE):
+        self.path = path
+        # Read from the hook thread as well as the GUI; the lock serializes access
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._cache = LRUDict(cache_size)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(_SCHEMA)
+            self._upgrade()
+            derive = self._create_derived()
+            self._db.commit()
+        self.reload()
+        if derive:
+            self._fill_derived()
+
+    def _create_derived(self):
+        """Create the derived tables that are missing; True if they need filling."""
+        tables = {name: sql for name, sql in self._db.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'")}
+        missing = 'hotkey_docs' not in tables or 'hotkey_refs' not in tables
+        if 'hotkey_docs' not in tables:
+            try:
+                self._db.execute(_DOCS_FTS)
+                tables['hotkey_docs'] = _DOCS_FTS
+            except sqlite3.OperationalError:
+                self._db.execute(_DOCS_PLAIN)
+        self.fts = tables.get('hotkey_docs', '').startswith('CREATE VIRTUAL')
+        for sql in _DERIVED:
+            self._db.execute(sql)
+        return missing
+
+    def _fill_derived(self):
+        # One full read, for databases made before the derived tables existed and after an import
+        with self._lock:
+            with self._db:
+                self._db.execute("DELETE FROM hotkey_docs")
+                self._db.execute("DELETE FROM hotkey_refs")
+                for row_id, key, entry in self._rows():
+                    self._derive(row_id, key, entry, replace=False)
+
+    def _derive(self, row_id, key, entry, replace=True):
+        if replace:
+            self._db.execute("DELETE FROM hotkey_docs WHERE rowid = ?", (row_id,))
+            self._db.execute("DELETE FROM hotkey_refs WHERE hotkey_id = ?", (row_id,))
+        self._db.execute("INSERT INTO hotkey_docs (rowid, doc) VALUES (?, ?)", (row_id, SearchIndex.document(key, entry)))
+        self._db.executemany("INSERT INTO hotkey_refs (hotkey_id, kind, path) VALUES (?, ?, ?)",
+                             [(row_id, kind, path) for kind, path in entry.file_refs()])
+
+    def _upgrade(self):
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(hotkeys)")}
+        for name, decl in _ADDED_COLUMNS.items():
+            if name not in columns:
+                self._db.execute(f"ALTER TABLE hotkeys ADD COLUMN {name} {decl}")
+        if 'abbr' not in columns:
+            # Abbreviation-only entries carry their abbreviation in the key
+            self._db.execute("UPDATE hotkeys SET abbr = substr(key, ?) WHERE key LIKE ? AND abbr IS NULL",
+                             (len(ABBR_KEY_PREFIX) + 1, ABBR_KEY_PREFIX + '%'))
+
+    def reload(self):
+        with self._lock:
+            rows = self._db.execute("SELECT key, id, n_actions, policy FROM hotkeys ORDER BY id").fetchall()
+        self._index = {key: (row_id, n, policy) for key, row_id, n, policy in rows}
+        self._cache.clear()
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._db.execute("PRAGMA user_version").fetchone()[0]
+
+    @property
+    def migrated(self):
+        return self.version >= 1
+
+    def import_json(self, path):
+        """One-shot import of a config.json in any shape `load_config` accepts; returns the count."""
+        raw_data = load_json(path)
+        rows = []
+        for k, v in raw_data.items():
+            rows.append(self._row(normalize_key(k), Hotkey.from_json(v)))
+        with self._lock:
+            with self._db:
+                self._db.executemany(_UPSERT, rows)
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.reload()
+        self._fill_derived()
+        return len(rows)
+
+    def restore_abbreviations(self, path):
+        """Fill in abbreviations an older import left out, from the config.json it was made from.
+
+        Only rows still without one are touched, so edits made in the database win.
+        """
+        updates = []
+        if path is not None:
+            for k, v in load_json(path).items():
+                abbr = Hotkey.from_json(v).abbr
+                if abbr.__class__ is str and abbr:
+                    updates.append((abbr, normalize_key(k)))
+        with self._lock:
+            with self._db:
+                self._db.executemany("UPDATE hotkeys SET abbr = ? WHERE key = ? AND abbr IS NULL", updates)
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._cache.clear()
+        return len(updates)
+
+    def mark_migrated(self):
+        with self._lock:
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._db.commit()
+
+    @staticmethod
+    def _row(key, entry):
+        entry = as_hotkey(entry)
+        data = entry.to_json()
+        actions = data.get('actions', [])
+        n = len(actions) if isinstance(actions, list) else 0
+        # Fields this version does not know are kept as a JSON object, like config.json keeps them
+        extra = json.dumps(dict(entry.extra), ensure_ascii=False) if entry.extra else None
+        return (key, data.get('tag', '') or '', data.get('policy'), data.get('abbr'), n,
+                json.dumps(actions, ensure_ascii=False), extra)
+
+    @staticmethod
+    def _entry(tag, policy, abbr, actions, extra):
+        return Hotkey(tag, json.loads(actions), policy, abbr, tuple(json.loads(extra).items()) if extra else ())
+
+    def abbreviations(self):
+        """(key, abbr) for every entry with an abbreviation, read from its index."""
+        with self._lock:
+            return self._db.execute("SELECT key, abbr FROM hotkeys WHERE abbr IS NOT NULL").fetchall()
+
+    def references(self):
+        """('image' | 'text', path as written) for every side file the entries use."""
+        with self._lock:
+            return self._db.execute("SELECT kind, path FROM hotkey_refs").fetchall()
+
+    def action_count(self, key):
+        return self._index[key][1] if key in self._index else 0
+
+    def policy(self, key):
+        return self._index[key][2] if key in self._index else None
+
+    def __getitem__(self, key):
+        entry = self._cache.get(key)
+        if entry is not None:
+            return entry
+        if key not in self._index:
+            raise KeyError(key)
+        with self._lock:
+            row = self._db.execute("SELECT tag, policy, abbr, actions, extra FROM hotkeys WHERE key = ?",
+                                   (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        entry = self._entry(*row)
+        self._cache[key] = entry
+        return entry
+
+    def __setitem__(self, key, entry):
+        row = self._row(key, entry)
+        with self._lock:
+            with self._db:
+                cur = self._db.execute(_UPSERT, row)
+                row_id = self._index[key][0] if key in self._index else cur.lastrowid
+                self._derive(row_id, key, as_hotkey(entry))
+        self._index[key] = (row_id, row[4], row[2])
+        self._cache[key] = entry
+
+    def __delitem__(self, key):
+        if key not in self._index:
+            raise KeyError(key)
+        row_id = self._index[key][0]
+        with self._lock:
+            with self._db:
+                self._db.execute("DELETE FROM hotkeys WHERE id = ?", (row_id,))
+                self._db.execute("DELETE FROM hotkey_docs WHERE rowid = ?", (row_id,))
+                self._db.execute("DELETE FROM hotkey_refs WHERE hotkey_id = ?", (row_id,))
+        del self._index[key]
+        self._cache.pop(key)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(list(self._index))
+
+    def __len__(self):
+        return len(self._index)
+
+    def items(self):
+        """Stream every entry in id order, a batch at a time, without filling the LRU."""
+        for row_id, key, entry in self._rows():
+            yield key, entry
+
+    def _rows(self):
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, key, tag, policy, abbr, actions, extra FROM hotkeys WHERE id > ? ORDER BY id LIMIT ?",
+                    (last, ITER_BATCH)).fetchall()
+            if not rows:
+                return
+            for row_id, key, tag, policy, abbr, actions, extra in rows:
+                yield row_id, key, self._entry(tag, policy, abbr, actions, extra)
+            last = rows[-1][0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _like(query):
+    """LIKE pattern and ESCAPE clause for a substring; the trigram index only serves unescaped patterns."""
+    if not any(c in query for c in '%_\\'):
+        return f"%{query}%", ""
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%", " ESCAPE '\\'"
+
+
+class SqliteSearch:
+    """SearchIndex's queries answered from a SqliteHotkeyStore's document table.
+
+    The store rewrites an entry's document whenever it writes the entry, so
+    `update` and `remove` have nothing to do and nothing is held in memory.
+    Substring queries of three or more characters use the FTS5 trigram
+    index; fuzzy matches need it and are skipped where SQLite lacks it.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def update(self, key, data):
+        pass
+
+    def remove(self, key):
+        pass
+
+    def _query(self, sql, params=()):
+        with self.store._lock:
+            return self.store._db.execute(sql, params).fetchall()
+
+    def _docs(self, keys):
+        """{key: document} for those of `keys` that are stored."""
+        index = self.store._index
+        ids = {index[k][0]: k for k in keys if k in index}
+        docs = {}
+        row_ids = list(ids)
+        for start in range(0, len(row_ids), 500):
+            chunk = row_ids[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for row_id, doc in self._query(f"SELECT rowid, doc FROM hotkey_docs WHERE rowid IN ({marks})", chunk):
+                docs[ids[row_id]] = doc
+        return docs
+
+    def search(self, query):
+        """Keys containing `query` in their key, tag or text values, in insertion order."""
+        query = query.strip().lower()
+        if not query:
+            return list(self.store)
+        pattern, escape = _like(query)
+        rows = self._query("SELECT h.key FROM hotkey_docs d JOIN hotkeys h ON h.id = d.rowid "
+                           f"WHERE d.doc LIKE ?{escape} ORDER BY d.rowid", (pattern,))
+        return [key for key, in rows]
+
+    def matches(self, key, query):
+        query = query.strip().lower()
+        return not query or query in self._docs([key]).get(key, '')
+
+    def _first_matches(self, query, limit, scan_limit=None):
+        pattern, escape = _like(query)
+        # Like SearchIndex, queries too short for the index only look at the first documents
+        source = "hotkey_docs" if scan_limit is None else f"(SELECT rowid, doc FROM hotkey_docs LIMIT {int(scan_limit)})"
+        rows = self._query(f"SELECT h.key FROM {source} d JOIN hotkeys h ON h.id = d.rowid "
+                           f"WHERE d.doc LIKE ?{escape} LIMIT ?", (pattern, limit))
+        return [key for key, in rows]
+
+    def fuzzy(self, query, limit):
+        """Keys sharing at least half of the query's trigrams, most shared first (typo tolerant)."""
+        grams = {query[i:i + GRAM] for i in range(len(query) - GRAM + 1)}
+        if not grams or not self.store.fts:
+            return []
+        counts = Counter()
+        for g in grams:
+            # Trigrams in more than FUZZY_POSTING_LIMIT documents are skipped, as in SearchIndex
+            rows = self._query("SELECT rowid FROM hotkey_docs WHERE hotkey_docs MATCH ? LIMIT ?",
+                               ('"' + g.replace('"', '""') + '"', FUZZY_POSTING_LIMIT + 1))
+            if len(rows) <= FUZZY_POSTING_LIMIT:
+                counts.update(row_id for row_id, in rows)
+        needed = max(1, (len(grams) + 1) // 2)
+        row_ids = [row_id for row_id, n in counts.most_common(limit) if n >= needed]
+        if not row_ids:
+            return []
+        keys = dict(self._query(f"SELECT id, key FROM hotkeys WHERE id IN ({','.join('?' * len(row_ids))})", row_ids))
+        return [keys[row_id] for row_id in row_ids if row_id in keys]
+
+    def top(self, query, limit, preferred=()):
+        """Up to `limit` keys for the palette, ranked as in SearchIndex.top."""
+        query = query.strip().lower()
+        hits = []
+        seen = set()
+        preferred = list(preferred)
+        for start in range(0, len(preferred), limit * 4):
+            chunk = preferred[start:start + limit * 4]
+            docs = self._docs(chunk)
+            for key in chunk:
+                if key in docs and query in docs[key] and key not in seen:
+                    hits.append(key)
+                    seen.add(key)
+                    if len(hits) >= limit:
+                        return hits
+        scan_limit = SHORT_QUERY_SCAN if len(query) < GRAM else None
+        for key in self._first_matches(query, limit + len(seen), scan_limit):
+            if key not in seen:
+                hits.append(key)
+                seen.add(key)
+                if len(hits) >= limit:
+                    return hits
+        if len(query) >= GRAM:
+            for key in self.fuzzy(query, limit):
+                if key not in seen:
+                    hits.append(key)
+                    seen.add(key)
+                    if len(hits) >= limit:
+                        return hits
+        return hits
@@ -0,0 +1,171 @@
+import os
+import re
+import json
+import time
+import threading
+
+from config_store import ConfigWriter
+
+COUNTERS_FILE = "counters.json"
+DEFAULT_DATE_FORMAT = "%Y-%m-%d"
+
+# {name} or {name:argument}; doubling the braces ({{date}}) keeps the text literal.
+# Any other {...} is ordinary text, so existing configs with braces are unaffected.
+_PLACEHOLDER = re.compile(r"(\{)?\{(date|clipboard|counter|env)(?::([^{}]*))?\}(\})?")
+
+
+class Template:
+    """Text action value with placeholders, compiled once per config load.
+
+    `parts` alternates literal strings (adjacent ones already joined) with
+    ('date', format), ('clipboard', None) and ('counter', name) pieces that
+    are filled in by `render` when the step runs. `{env:VAR}` is resolved at
+    compile time since the environment does not change while we run.
+    Templates concatenate with strings and each other, so the plan compiler
+    can merge adjacent text steps as before.
+    """
+    __slots__ = ('parts',)
+
+    def __init__(self, parts):
+        self.parts = tuple(parts)
+
+    def __add__(self, other):
+        if isinstance(other, Template):
+            return Template(_join(self.parts + other.parts))
+        return Template(_join(self.parts + (other,)))
+
+    def __radd__(self, other):
+        return Template(_join((other,) + self.parts))
+
+    def __eq__(self, other):
+        return isinstance(other, Template) and self.parts == other.parts
+
+    def __hash__(self):
+        return hash(self.parts)
+
+    def __repr__(self):
+        return f"Template({self.parts!r})"
+
+    def render(self, clipboard=None, counters=None):
+        """The text to paste now; `clipboard` is read at most once, each counter advances once."""
+        out = []
+        now = clip = None
+        taken = {}
+        for part in self.parts:
+            if part.__class__ is str:
+                out.append(part)
+                continue
+            kind, arg = part
+            if kind == 'date':
+                if now is None:
+                    now = time.localtime()
+                out.append(time.strftime(arg, now))
+            elif kind == 'clipboard':
+                if clip is None:
+                    clip = (clipboard.text() or "") if clipboard is not None else ""
+                out.append(clip)
+            elif kind == 'counter':
+                if arg not in taken:
+                    taken[arg] = str(counters.next(arg)) if counters is not None else "0"
+                out.append(taken[arg])
+        return "".join(out)
+
+
+def _join(parts):
+    joined = []
+    for part in parts:
+        if part.__class__ is str:
+            if not part:
+                continue
+            if joined and joined[-1].__class__ is str:
+                joined[-1] += part
+                continue
+        joined.append(part)
+    return joined
+
+
+def compile_template(text):
+    """(value, errors) for a text action: `text` itself when it has no placeholders, else a Template."""
+    if '{' not in text:
+        return text, []
+    parts = []
+    errors = []
+    pos = 0
+    dynamic = False
+    for m in _PLACEHOLDER.finditer(text):
+        parts.append(text[pos:m.start()])
+        pos = m.end()
+        open_extra, name, arg, close_extra = m.groups()
+        if open_extra and close_extra:
+            parts.append(m.group(0)[1:-1])
+            continue
+        parts.append(open_extra or "")
+        if name == 'date':
+            parts.append(('date', arg or DEFAULT_DATE_FORMAT))
+            dynamic = True
+        elif name == 'clipboard':
+            parts.append(('clipboard', None))
+            dynamic = True
+        elif name == 'counter':
+            if not arg:
+                errors.append("{counter} needs a name, e.g. {counter:invoice}")
+            else:
+                parts.append(('counter', arg))
+                dynamic = True
+        elif not arg:
+            errors.append("{env} needs a variable name, e.g. {env:USERNAME}")
+        elif arg not in os.environ:
+            errors.append(f"environment variable {arg!r} is not set")
+        else:
+            parts.append(os.environ[arg])
+        parts.append(close_extra or "")
+    parts.append(text[pos:])
+    parts = _join(parts)
+    if not dynamic:
+        return "".join(parts), errors
+    return Template(parts), errors
+
+
+def placeholders(text):
+    """Short labels of the placeholders in `text`, e.g. ['{date}', '{counter:invoice}']."""
+    labels = []
+    for m in _PLACEHOLDER.finditer(text):
+        open_extra, name, arg, close_extra = m.groups()
+        if open_extra and close_extra:
+            continue
+        labels.append(f"{{{name}:{arg}}}" if arg and name != 'date' else f"{{{name}}}")
+    return labels
+
+
+class Counters:
+    """Named counters behind {counter:name}; values start at 1.
+
+    `next` runs on the executor thread and only touches memory; the values
+    are written to COUNTERS_FILE through a ConfigWriter, so a burst of pastes
+    costs one small write and the file is always complete on disk.
+    """
+
+    def __init__(self, path=COUNTERS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.values = {}
+        self._writer = None  # started on first use
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.values = {str(k): int(v) for k, v in json.load(f).items()}
+            except Exception as e:
+                print(f"Error loading counters: {e}")
+
+    def next(self, name):
+        with self._lock:
+            value = self.values.get(name, 0) + 1
+            self.values[name] = value
+            if self._writer is None:
+                self._writer = ConfigWriter(self.path)
+            self._writer.schedule(self.values)
+        return value
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
@@ -0,0 +1,140 @@
+import os
+import re
+import mmap
+import hashlib
+from collections import Counter
+
+from config_model import Action
+from templates import compile_template
+
+TEXT_DIR = "texts"
+# Text values longer than this (characters) are kept in side files and pasted in chunks
+LARGE_TEXT_THRESHOLD = 256 * 1024
+# Most characters pasted in one clipboard round; chunks end on a line break when one is near
+PASTE_CHUNK = 32 * 1024
+# Pause after each chunk so the target application can take in the paste
+CHUNK_GAP = 0.05
+
+_STORED_NAME = re.compile(r"^[0-9a-f]{32}\.txt$")
+
+
+def split_text(text, limit=PASTE_CHUNK):
+    """Yield pieces of `text` of at most `limit` characters, cut after a newline where possible."""
+    pos = 0
+    end_all = len(text)
+    while pos < end_all:
+        end = min(pos + limit, end_all)
+        if end < end_all:
+            cut = text.rfind('\n', pos, end)
+            if cut >= pos + limit // 2:
+                end = cut + 1
+        yield text[pos:end]
+        pos = end
+
+
+def iter_file_chunks(path, limit=PASTE_CHUNK):
+    """Yield (text, bytes consumed) for a UTF-8 side file through mmap, one chunk in memory at a time.
+
+    Chunks hold at most `limit` bytes and never split a character; like
+    `split_text` they end after a newline when there is one in their second half.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            size = len(mm)
+            while pos < size:
+                end = min(pos + limit, size)
+                if end < size:
+                    cut = mm.rfind(b'\n', pos, end)
+                    if cut >= pos + limit // 2:
+                        end = cut + 1
+                    else:
+                        # Back off to the start of a UTF-8 sequence
+                        while end > pos and (mm[end] & 0xC0) == 0x80:
+                            end -= 1
+                yield mm[pos:end].decode('utf-8', errors='replace'), end - pos
+                pos = end
+
+
+class TextStore:
+    """Content-addressed side files for very large text action values.
+
+    `externalize` swaps inline values over `threshold` characters for a
+    {'file': path} reference, so config entries (and config.json) stay small
+    and the executor streams the file through mmap instead of holding it.
+    References are counted like ImageStore's; `collect_garbage` removes files
+    no entry points at.
+    """
+
+    def __init__(self, root=TEXT_DIR, threshold=LARGE_TEXT_THRESHOLD):
+        self.root = root
+        self.threshold = threshold
+        self.refs = Counter()
+
+    def store(self, text):
+        """Write `text` once per distinct content and return its path."""
+        data = text.encode('utf-8')
+        path = os.path.join(self.root, hashlib.sha256(data).hexdigest()[:32] + ".txt")
+        if not os.path.exists(path):
+            os.makedirs(self.root, exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return path
+
+    def _is_large(self, act):
+        if not (act.__class__ is Action and act.type == 'text' and act.value.__class__ is str
+                and len(act.value) > self.threshold):
+            return False
+        # Side files are streamed as they are; text that compiles to something else
+        # (placeholders, {{escapes}}) stays inline so the template still applies
+        return compile_template(act.value)[0] == act.value
+
+    def externalize(self, entry):
+        """Hotkey `entry` with large inline texts moved to side files; the same object when there are none."""
+        actions = entry.actions
+        if actions.__class__ is not tuple or not any(self._is_large(a) for a in actions):
+            return entry
+        new_actions = []
+        for act in actions:
+            if self._is_large(act):
+                act = act.replace(value=None, file=self.store(act.value), chars=len(act.value))
+            new_actions.append(act)
+        return entry.replace(actions=new_actions)
+
+    @staticmethod
+    def _ref(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def set_references(self, paths):
+        self.refs = Counter(self._ref(p) for p in paths)
+
+    def retain(self, paths):
+        for p in paths:
+            self.refs[self._ref(p)] += 1
+
+    def release(self, paths):
+        for p in paths:
+            key = self._ref(p)
+            self.refs[key] -= 1
+            if self.refs[key] <= 0:
+                del self.refs[key]
+
+    def collect_garbage(self):
+        """Delete side files with no references; returns the count."""
+        if not os.path.isdir(self.root):
+            return 0
+        removed = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not _STORED_NAME.match(name) or self.refs.get(self._ref(path)):
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
@@ -0,0 +1,136 @@
+import json
+import time
+import threading
+
+# Samples kept per (hotkey, metric) and trace events kept overall
+SAMPLES_PER_METRIC = 512
+TRACE_EVENTS = 20000
+
+# Metric names, in the order the stats tab lists them
+METRICS = (
+    'dispatch',         # hook callback -> executor starts the sequence
+    'template_render',  # filling in a text template's placeholders
+    'clipboard_write',  # set_text / set_image call
+    'clipboard_ready',  # until the clipboard confirmed the content
+    'image_load',       # image cache lookup (decode on a miss)
+    'paste_send',       # ctrl+v / key chain injection
+    'delay_late',       # actual minus configured step delay
+    'sequence',         # trigger to last step finished
+)
+
+
+class RingBuffer:
+    """Fixed-size buffer that overwrites its oldest entry; append is O(1) and allocation-free."""
+    __slots__ = ('_items', '_next', 'count')
+
+    def __init__(self, capacity):
+        self._items = [None] * capacity
+        self._next = 0
+        self.count = 0
+
+    def append(self, item):
+        self._items[self._next] = item
+        self._next = (self._next + 1) % len(self._items)
+        self.count += 1
+
+    def values(self):
+        if self.count < len(self._items):
+            return self._items[:self.count]
+        return self._items[self._next:] + self._items[:self._next]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class Tracer:
+    """Low-overhead timing recorder for hotkey playback.
+
+    Per-hotkey metrics go into small ring buffers that `stats()` turns into
+    p50/p95/p99 summaries; every timed span is also kept as a Chrome
+    trace-event so a run can be inspected in chrome://tracing or Perfetto.
+    Recording is called from the executor thread; reading from the GUI.
+    """
+
+    def __init__(self, samples=SAMPLES_PER_METRIC, events=TRACE_EVENTS):
+        self.enabled = True
+        self._samples = samples
+        self._metrics = {}  # (hotkey, metric) -> RingBuffer of seconds
+        self._errors = {}   # hotkey -> count
+        self._events = RingBuffer(events)
+        self._epoch = time.perf_counter()
+
+    def _ts(self, t):
+        return (t - self._epoch) * 1e6
+
+    def record(self, key, metric, seconds, start=None, **args):
+        """Add one sample; with `start` (perf_counter) it also becomes a trace span."""
+        if not self.enabled:
+            return
+        buf = self._metrics.get((key, metric))
+        if buf is None:
+            buf = self._metrics[(key, metric)] = RingBuffer(self._samples)
+        buf.append(seconds)
+        if start is not None:
+            args['hotkey'] = key
+            self._events.append({
+                'name': metric, 'cat': 'quickpaste', 'ph': 'X',
+                'ts': self._ts(start), 'dur': seconds * 1e6,
+                'pid': 1, 'tid': threading.get_ident(), 'args': args,
+            })
+
+    def error(self, key, message):
+        self._errors[key] = self._errors.get(key, 0) + 1
+        if self.enabled:
+            self._events.append({
+                'name': 'error', 'cat': 'quickpaste', 'ph': 'i', 's': 't',
+                'ts': self._ts(time.perf_counter()),
+                'pid': 1, 'tid': threading.get_ident(), 'args': {'hotkey': key, 'message': message},
+            })
+
+    def stats(self):
+        """{hotkey: {metric: {count, p50_ms, p95_ms, p99_ms, max_ms}}, plus 'errors'}."""
+        out = {}
+        for (key, metric), buf in list(self._metrics.items()):
+            values = sorted(buf.values())
+            out.setdefault(key, {})[metric] = {
+                'count': buf.count,
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p95_ms': percentile(values, 0.95) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+                'max_ms': (values[-1] if values else 0.0) * 1000,
+            }
+        for key, count in list(self._errors.items()):
+            out.setdefault(key, {})['errors'] = count
+        return out
+
+    def clear(self):
+        self._metrics = {}
+        self._errors = {}
+        self._events = RingBuffer(len(self._events._items))
+
+    def chrome_trace(self):
+        return {'traceEvents': self._events.values(), 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+
+class StartupTimer:
+    """Milestones since launch, e.g. imports -> config -> hotkeys -> tray -> ui."""
+
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.marks = []  # (name, seconds since t0)
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.t0))
+
+    def total_ms(self):
+        return self.marks[-1][1] * 1000 if self.marks else 0.0
+
+    def summary(self):
+        return ", ".join(f"{name} {t * 1000:.0f} ms" for name, t in self.marks)
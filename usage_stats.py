@@ -0,0 +1,68 @@
+import os
+import json
+import time
+import threading
+
+USAGE_FILE = "usage.json"
+# A use counts half as much after this many seconds
+USAGE_HALF_LIFE = 7 * 24 * 3600
+
+
+class UsageStats:
+    """Frecency of hotkeys: each use adds 1 to a score that halves every USAGE_HALF_LIFE.
+
+    Written to USAGE_FILE on close. `record` is called from the hook thread.
+    """
+
+    def __init__(self, path=USAGE_FILE, half_life=USAGE_HALF_LIFE):
+        self.path = path
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self.entries = {}  # key -> [score at `last`, last use (epoch seconds), total uses]
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = {k: [float(v[0]), float(v[1]), int(v[2])] for k, v in json.load(f).items()}
+            except Exception as e:
+                print(f"Error loading usage stats: {e}")
+
+    def _decayed(self, entry, now):
+        return entry[0] * 0.5 ** ((now - entry[1]) / self.half_life)
+
+    def record(self, key, now=None):
+        if not key:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.entries[key] = [1.0, now, 1]
+            else:
+                self.entries[key] = [self._decayed(entry, now) + 1.0, now, entry[2] + 1]
+            self.dirty = True
+
+    def forget(self, key):
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self.dirty = True
+
+    def ranked(self, now=None):
+        """Keys by current score, best first."""
+        now = time.time() if now is None else now
+        with self._lock:
+            scored = [(self._decayed(e, now), k) for k, e in self.entries.items()]
+        scored.sort(reverse=True)
+        return [k for _, k in scored]
+
+    def save(self):
+        if not self.dirty:
+            return
+        with self._lock:
+            data = dict(self.entries)
+            self.dirty = False
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"Error saving usage stats: {e}")